@@ -3,32 +3,51 @@
 Test runner script for Signal Protocol implementation.
 
 This script runs all tests in the organized test structure.
+
+By default all tests are discovered and run in this interpreter. Pass
+``--isolated`` to run every test file in its own subprocess instead, and
+``-v`` for verbose output.
 """
 
 import sys
 import os
 import unittest
 import subprocess
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
 
 # Add the project root to the Python path
 project_root = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, project_root)
 
+# Environment shared by every test subprocess
+test_env = os.environ.copy()
+test_env['PYTHONPATH'] = project_root
+
+
+def run_test_file(test_file_path, verbose=False):
+    """Run a single test file using subprocess with proper PYTHONPATH
 
-def run_test_file(test_file_path):
-    """Run a single test file using subprocess with proper PYTHONPATH"""
-    env = os.environ.copy()
-    env['PYTHONPATH'] = project_root
+    The child writes straight to an unnamed temporary file rather than a
+    pipe, and its output is only read back and decoded when the file
+    fails or verbose output is requested.
 
+    Returns:
+        tuple: (success, report) where report is the text to print
+    """
     cmd = [sys.executable, test_file_path]
-    result = subprocess.run(cmd, env=env, capture_output=True, text=True)
+    with tempfile.TemporaryFile() as output:
+        returncode = subprocess.call(
+            cmd, env=test_env, stdout=output, stderr=subprocess.STDOUT)
+        success = returncode == 0
 
-    print(f"Running {test_file_path}:")
-    print(result.stdout)
-    if result.stderr:
-        print("STDERR:", result.stderr)
+        # Buffer the report so output from concurrent runs does not interleave
+        report = f"Running {test_file_path}: {'OK' if success else 'FAILED'}\n"
+        if verbose or not success:
+            output.seek(0)
+            report += output.read().decode('utf-8', 'replace')
 
-    return result.returncode == 0
+    return success, report
 
 
 def find_all_test_files():
@@ -44,8 +63,21 @@ def find_all_test_files():
     return test_files
 
 
-def run_all_tests():
-    """Run all tests in the project"""
+def run_all_tests(verbosity=1):
+    """Run all tests in the project in a single interpreter"""
+    loader = unittest.TestLoader()
+    suite = loader.discover(
+        os.path.join(project_root, 'tests'),
+        pattern='test_*.py',
+        top_level_dir=project_root
+    )
+
+    result = unittest.TextTestRunner(verbosity=verbosity).run(suite)
+    return result.wasSuccessful()
+
+
+def run_all_tests_isolated(verbose=False):
+    """Run every test file in its own subprocess"""
     test_files = find_all_test_files()
 
     print(f"Found {len(test_files)} test files:")
@@ -53,9 +85,16 @@ def run_all_tests():
         print(f"  - {os.path.relpath(test_file, project_root)}")
     print()
 
+    # Each test file runs in its own subprocess, so threads are enough to
+    # keep several of them in flight at once
+    max_workers = max(1, (os.cpu_count() or 2) - 2)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(
+            lambda test_file: run_test_file(test_file, verbose), test_files))
+
     all_passed = True
-    for test_file in test_files:
-        success = run_test_file(test_file)
+    for success, report in results:
+        print(report.rstrip())
         if not success:
             all_passed = False
         print("-" * 70)
@@ -64,7 +103,11 @@ def run_all_tests():
 
 
 if __name__ == '__main__':
-    success = run_all_tests()
+    verbose = '-v' in sys.argv
+    if '--isolated' in sys.argv:
+        success = run_all_tests_isolated(verbose)
+    else:
+        success = run_all_tests(verbosity=2 if verbose else 1)
 
     if success:
         print("🎉 All tests passed!")
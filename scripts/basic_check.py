@@ -5,11 +5,17 @@
 这个脚本只运行不依赖外部工具的检查，适合在没有安装开发依赖的环境中使用。
 """
 
+import ast
+import re
 import subprocess
 import sys
 import os
 from pathlib import Path
 
+from functools import lru_cache
+
+from check_utils import all_py_files, find_missing_files, init_code_lines, map_files
+
 
 def run_command(cmd, description):
     """运行命令并返回结果"""
@@ -55,10 +61,7 @@ def check_project_structure():
         "run_tests.py"
     ]
 
-    missing_files = []
-    for file_path in required_files:
-        if not Path(file_path).exists():
-            missing_files.append(file_path)
+    missing_files = find_missing_files(required_files)
 
     if missing_files:
         print("❌ 缺少以下必需文件:")
@@ -70,38 +73,136 @@ def check_project_structure():
         return True
 
 
+# 一次匹配整个文件中所有违规的导入语句 (注释行不会匹配)
+_IMPORT_RE = re.compile(
+    rb'^[ \t]*(?:'
+    rb'(?P<keys>from[ \t]+signal_protocol\.keys[ \t]+import\b)'
+    rb'|(?P<root>from[ \t]+signal_protocol[ \t]+import\b)'
+    rb'|(?P<star>(?:from[ \t]+\S+[ \t]+)?import[ \t]+\*)'
+    rb').*$',
+    re.M
+)
+
+
+def _find_import_violations(data):
+    """返回文件字节中的导入风格问题 (行号, 行内容, 原因)"""
+    violations = []
+    for match in _IMPORT_RE.finditer(data):
+        line_num = data.count(b'\n', 0, match.start()) + 1
+        line = match.group(0).decode('utf-8', 'replace').strip()
+        # 检查是否有从 __init__.py 导入的情况
+        if match.group('keys'):
+            reason = "避免从 keys 包直接导入，使用具体模块路径"
+        elif match.group('root'):
+            reason = "避免从根包导入，使用具体模块路径"
+        else:
+            reason = "禁止使用通配符导入"
+        violations.append((line_num, line, reason))
+    return violations
+
+
+def _is_main_guard(node):
+    """判断节点是否为顶层的 if __name__ == '__main__' 语句"""
+    if not isinstance(node, ast.If):
+        return False
+    test = node.test
+    if not (isinstance(test, ast.Compare) and len(test.ops) == 1
+            and isinstance(test.ops[0], ast.Eq)):
+        return False
+    operands = (test.left, test.comparators[0])
+    names = [op for op in operands if isinstance(op, ast.Name)]
+    consts = [op for op in operands if isinstance(op, ast.Constant)]
+    return (len(names) == 1 and names[0].id == '__name__'
+            and len(consts) == 1 and consts[0].value == '__main__')
+
+
+def _has_main_guard(data, path):
+    """用 AST 检查模块是否包含 if __name__ == '__main__' 测试部分
+
+    只检查模块顶层语句，注释和文档字符串中的同名文本不会被误判。
+    """
+    try:
+        tree = ast.parse(data, filename=str(path))
+    except SyntaxError:
+        return False
+    return any(_is_main_guard(node) for node in tree.body)
+
+
+def _scan_file(path):
+    """读取一次文件，并运行所有适用于该路径的检查
+
+    Returns:
+        dict: {检查名: 结果}，只包含适用的检查；读取失败时结果为 None，
+              错误信息保存在 'error' 中
+    """
+    top = path.parts[0]
+    is_init = path.name == '__init__.py'
+
+    # __init__.py 应该为空或只包含注释
+    # 导入风格只检查源码和测试
+    # 模块测试部分只检查源码模块，不包括 __init__.py
+    checks = []
+    if is_init:
+        checks.append('init')
+    if top in ('signal_protocol', 'tests'):
+        checks.append('imports')
+    if top == 'signal_protocol' and not is_init:
+        checks.append('tests')
+    if not checks:
+        return {}
+
+    try:
+        data = Path(path).read_bytes()
+    except Exception as e:
+        results = dict.fromkeys(checks)
+        results['error'] = str(e)
+        return results
+
+    results = {}
+    if 'init' in checks:
+        results['init'] = init_code_lines(data)
+    if 'imports' in checks:
+        results['imports'] = _find_import_violations(data)
+    if 'tests' in checks:
+        results['tests'] = _has_main_guard(data, path)
+    return results
+
+
+@lru_cache(maxsize=None)
+def scan_source_tree():
+    """遍历一次源码树，每个文件只读取一次，返回 {路径: 检查结果}"""
+    files = all_py_files(".")
+    return dict(zip(files, map_files(_scan_file, files)))
+
+
+def _results_for(check):
+    """返回需要运行指定检查的文件及其 (结果, 读取错误)"""
+    return [(path, results[check], results.get('error'))
+            for path, results in scan_source_tree().items() if check in results]
+
+
 def check_init_files():
     """检查 __init__.py 文件是否为空或只包含注释"""
     print("\n📦 检查 __init__.py 文件 (应该为空或只包含注释)")
     print("-" * 50)
 
-    init_files = list(Path(".").rglob("__init__.py"))
     violations = []
 
-    for init_file in init_files:
-        # 跳过一些特殊目录
-        if any(part in str(init_file) for part in ['.venv', '__pycache__', '.git']):
-            continue
-
-        try:
-            content = init_file.read_text().strip()
-            # 移除注释行和空行
-            lines = [line.strip() for line in content.split('\n')
-                     if line.strip() and not line.strip().startswith('#')]
-
-            if lines:
-                violations.append((init_file, lines))
-                print(f"❌ {init_file} 包含非注释代码:")
-                for line in lines[:3]:  # 只显示前3行
-                    print(f"    {line}")
-                if len(lines) > 3:
-                    print(f"    ... (还有 {len(lines) - 3} 行)")
-            else:
-                print(f"✅ {init_file} - 符合规范 (空或只有注释)")
-        except Exception as e:
-            print(f"❌ 读取 {init_file} 时出错: {e}")
+    for init_file, lines, error in _results_for('init'):
+        if error is not None:
+            print(f"❌ 读取 {init_file} 时出错: {error}")
             return False
 
+        if lines:
+            violations.append((init_file, lines))
+            print(f"❌ {init_file} 包含非注释代码:")
+            for line in lines[:3]:  # 只显示前3行
+                print(f"    {line}")
+            if len(lines) > 3:
+                print(f"    ... (还有 {len(lines) - 3} 行)")
+        else:
+            print(f"✅ {init_file} - 符合规范 (空或只有注释)")
+
     if violations:
         print(f"\n❌ 发现 {len(violations)} 个不符合规范的 __init__.py 文件")
         print("建议: 保持 __init__.py 文件为空或只包含注释，使用具体的导入路径")
@@ -116,30 +217,14 @@ def check_import_style():
     print("\n📥 检查导入风格")
     print("-" * 50)
 
-    python_files = list(Path("signal_protocol").rglob("*.py")) + \
-        list(Path("tests").rglob("*.py"))
     violations = []
 
-    for py_file in python_files:
-        if '__pycache__' in str(py_file):
+    for py_file, found, error in _results_for('imports'):
+        if error is not None:
+            print(f"❌ 读取 {py_file} 时出错: {error}")
             continue
-
-        try:
-            content = py_file.read_text()
-            lines = content.split('\n')
-
-            for i, line in enumerate(lines, 1):
-                line = line.strip()
-                # 检查是否有从 __init__.py 导入的情况
-                if 'from signal_protocol.keys import' in line and not line.startswith('#'):
-                    violations.append((py_file, i, line, "避免从 keys 包直接导入，使用具体模块路径"))
-                elif 'from signal_protocol import' in line and not line.startswith('#'):
-                    violations.append((py_file, i, line, "避免从根包导入，使用具体模块路径"))
-                elif 'import *' in line and not line.startswith('#'):
-                    violations.append((py_file, i, line, "禁止使用通配符导入"))
-
-        except Exception as e:
-            print(f"❌ 读取 {py_file} 时出错: {e}")
+        for line_num, line, reason in found:
+            violations.append((py_file, line_num, line, reason))
 
     if violations:
         print(f"❌ 发现 {len(violations)} 个导入风格问题:")
@@ -159,32 +244,23 @@ def check_module_tests():
     print("\n🧪 检查模块测试部分 (if __name__ == '__main__')")
     print("-" * 50)
 
-    # 只检查源码模块，不包括测试文件和 __init__.py
     source_files = []
-    for py_file in Path("signal_protocol").rglob("*.py"):
-        if '__pycache__' in str(py_file) or py_file.name == '__init__.py':
-            continue
-        source_files.append(py_file)
-
     missing_tests = []
     has_tests = []
 
-    for py_file in source_files:
-        try:
-            content = py_file.read_text()
-
-            # 检查是否包含 if __name__ == "__main__" 或 if __name__ == '__main__'
-            if 'if __name__ ==' in content and ('__main__' in content):
-                has_tests.append(py_file)
-                print(f"✅ {py_file} - 包含模块测试")
-            else:
-                missing_tests.append(py_file)
-                print(f"⚠️  {py_file} - 缺少模块测试")
-
-        except Exception as e:
-            print(f"❌ 读取 {py_file} 时出错: {e}")
+    for py_file, has_test, error in _results_for('tests'):
+        if error is not None:
+            print(f"❌ 读取 {py_file} 时出错: {error}")
             return False
 
+        source_files.append(py_file)
+        if has_test:
+            has_tests.append(py_file)
+            print(f"✅ {py_file} - 包含模块测试")
+        else:
+            missing_tests.append(py_file)
+            print(f"⚠️  {py_file} - 缺少模块测试")
+
     print(f"\n📊 模块测试统计:")
     print(f"  包含测试: {len(has_tests)}/{len(source_files)}")
     print(f"  缺少测试: {len(missing_tests)}/{len(source_files)}")
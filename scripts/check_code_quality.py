@@ -10,6 +10,8 @@ import sys
 import os
 from pathlib import Path
 
+from check_utils import all_py_files, find_missing_files, scan_init_file
+
 
 def run_command(cmd, description):
     """运行命令并返回结果"""
@@ -58,10 +60,7 @@ def check_project_structure():
         "run_tests.py"
     ]
 
-    missing_files = []
-    for file_path in required_files:
-        if not Path(file_path).exists():
-            missing_files.append(file_path)
+    missing_files = find_missing_files(required_files)
 
     if missing_files:
         print("❌ 缺少以下必需文件:")
@@ -78,33 +77,26 @@ def check_init_files():
     print("\n📦 检查 __init__.py 文件 (应该为空或只包含注释)")
     print("-" * 50)
 
-    init_files = list(Path(".").rglob("__init__.py"))
+    init_files = [path for path in all_py_files(".")
+                  if path.name == "__init__.py"]
     violations = []
 
     for init_file in init_files:
-        # 跳过一些特殊目录
-        if any(part in str(init_file) for part in ['.venv', '__pycache__', '.git']):
-            continue
-
-        try:
-            content = init_file.read_text().strip()
-            # 移除注释行和空行
-            lines = [line.strip() for line in content.split('\n')
-                     if line.strip() and not line.strip().startswith('#')]
-
-            if lines:
-                violations.append((init_file, lines))
-                print(f"❌ {init_file} 包含非注释代码:")
-                for line in lines[:3]:  # 只显示前3行
-                    print(f"    {line}")
-                if len(lines) > 3:
-                    print(f"    ... (还有 {len(lines) - 3} 行)")
-            else:
-                print(f"✅ {init_file} - 符合规范 (空或只有注释)")
-        except Exception as e:
-            print(f"❌ 读取 {init_file} 时出错: {e}")
+        lines, error = scan_init_file(init_file)
+        if error is not None:
+            print(f"❌ 读取 {init_file} 时出错: {error}")
             return False
 
+        if lines:
+            violations.append((init_file, lines))
+            print(f"❌ {init_file} 包含非注释代码:")
+            for line in lines[:3]:  # 只显示前3行
+                print(f"    {line}")
+            if len(lines) > 3:
+                print(f"    ... (还有 {len(lines) - 3} 行)")
+        else:
+            print(f"✅ {init_file} - 符合规范 (空或只有注释)")
+
     if violations:
         print(f"\n❌ 发现 {len(violations)} 个不符合规范的 __init__.py 文件")
         print("建议: 保持 __init__.py 文件为空或只包含注释，使用具体的导入路径")
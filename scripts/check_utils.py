@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+代码质量检查脚本的共享工具
+
+遍历源码树的结果会被缓存，多个检查共享同一次遍历。
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+
+
+# 遍历时跳过的目录
+SKIP_DIRS = {'.venv', '__pycache__', '.git', '.mypy_cache', '.pytest_cache'}
+
+# 文件数达到该阈值时才使用进程池，文件较少时进程启动开销大于扫描本身
+PARALLEL_THRESHOLD = 64
+
+
+@lru_cache(maxsize=None)
+def all_py_files(root):
+    """返回 root 下所有 Python 文件 (跳过 SKIP_DIRS 中的目录)
+
+    在 os.walk 层面剪枝，被跳过的目录整棵子树都不会被遍历。
+    """
+    files = []
+    for dirpath, dirs, filenames in os.walk(root):
+        dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        files.extend(Path(dirpath, name) for name in filenames if name.endswith('.py'))
+    return tuple(files)
+
+
+def map_files(func, files):
+    """对每个文件调用 func 并按顺序返回结果，文件较多时分片到多个进程执行"""
+    files = list(files)
+    if len(files) < PARALLEL_THRESHOLD:
+        return [func(path) for path in files]
+
+    workers = max(1, (os.cpu_count() or 2) - 2)
+    chunksize = max(16, len(files) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(func, files, chunksize=chunksize))
+
+
+def find_missing_files(file_paths):
+    """返回 file_paths 中不存在的文件，每个父目录只扫描一次"""
+    present_by_parent = {}
+    missing = []
+    for file_path in file_paths:
+        parent, name = os.path.split(file_path)
+        if parent not in present_by_parent:
+            try:
+                with os.scandir(parent or ".") as entries:
+                    present_by_parent[parent] = {entry.name for entry in entries}
+            except OSError:
+                present_by_parent[parent] = set()
+        if name not in present_by_parent[parent]:
+            missing.append(file_path)
+    return missing
+
+
+# __init__.py 中的非注释、非空行
+_CODE_LINE_RE = re.compile(rb'^[ \t]*(?!#)\S.*$', re.M)
+
+
+def init_code_lines(data):
+    """返回文件字节中的非注释代码行 (直接在字节上匹配，跳过注释行和空行)"""
+    return [line.decode('utf-8', 'replace').strip()
+            for line in _CODE_LINE_RE.findall(data)]
+
+
+def scan_init_file(path):
+    """返回 __init__.py 中的非注释代码行，以及读取错误 (如有)"""
+    try:
+        # 空文件无需读取
+        if os.stat(path).st_size == 0:
+            return [], None
+        data = Path(path).read_bytes()
+    except Exception as e:
+        return None, str(e)
+
+    return init_code_lines(data), None
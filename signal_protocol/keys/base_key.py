@@ -1,14 +1,62 @@
 """Base classes and utilities for Signal Protocol keys"""
 
+import base64
+import binascii
 import os
-import nacl.bindings
-import nacl.public
+import sys
+import threading
 
 from abc import ABC
 
+# nacl is imported inside the generate_* functions so that importing the
+# key classes alone does not load libsodium
+
+
+class _RandPool(threading.local):
+    """Thread-local buffer of os.urandom output handed out in slices
+
+    Drawing one large chunk and slicing it replaces one getrandom syscall
+    per key with one per chunk. Every byte is handed out at most once.
+    Only generate_key_pair_manual draws from it, since the buffer keeps
+    future private keys in memory for the life of the thread.
+    """
+
+    def __init__(self, chunk: int = 1 << 15):
+        self.chunk = chunk
+        self.buf = b''
+        self.off = 0
+
+    def take(self, n: int) -> bytes:
+        """Return n fresh random bytes, refilling the buffer when exhausted"""
+        if self.off + n > len(self.buf):
+            self.buf = os.urandom(max(self.chunk, n))
+            self.off = 0
+        out = self.buf[self.off:self.off + n]
+        self.off += n
+        return out
+
+
+_pool = _RandPool()
+
+
+def _reset_rand_pool() -> None:
+    """Discard the inherited pool so a forked child never reuses parent bytes"""
+    global _pool
+    _pool = _RandPool()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_rand_pool)
+
 
 class BaseKey(ABC):
-    """Abstract base class for all key types in the Signal Protocol"""
+    """Abstract base class for all key types in the Signal Protocol
+
+    The key bytes are read-only, so anything derived from them (cached
+    encodings, Edwards keys) stays valid for the life of the object.
+    """
+
+    __slots__ = ('_public_key',)
 
     def __init__(self, public_key: bytes):
         """
@@ -19,16 +67,27 @@ class BaseKey(ABC):
         """
         if len(public_key) != 32:
             raise ValueError("Public key must be 32 bytes")
-        self.public_key = public_key
+        self._public_key = public_key
+
+    @property
+    def public_key(self) -> bytes:
+        """The 32-byte public key"""
+        return self._public_key
 
     @property
     def public_key_bytes(self) -> bytes:
         """Get the public key as bytes"""
-        return self.public_key
+        return self._public_key
 
 
 class BaseKeyPair(ABC):
-    """Abstract base class for all key pair types in the Signal Protocol"""
+    """Abstract base class for all key pair types in the Signal Protocol
+
+    The key bytes are read-only, so anything derived from them (cached
+    encodings, the XEdDSA scalar) stays valid for the life of the object.
+    """
+
+    __slots__ = ('_public_key', '_private_key')
 
     def __init__(self, public_key: bytes, private_key: bytes):
         """
@@ -43,18 +102,81 @@ class BaseKeyPair(ABC):
         if len(private_key) != 32:
             raise ValueError("Private key must be 32 bytes")
 
-        self.public_key = public_key
-        self.private_key = private_key
+        self._public_key = public_key
+        self._private_key = private_key
+
+    @property
+    def public_key(self) -> bytes:
+        """The 32-byte public key"""
+        return self._public_key
+
+    @property
+    def private_key(self) -> bytes:
+        """The 32-byte private key"""
+        return self._private_key
 
     @property
     def public_key_bytes(self) -> bytes:
         """Get the public key as bytes"""
-        return self.public_key
+        return self._public_key
 
     @property
     def private_key_bytes(self) -> bytes:
         """Get the private key as bytes"""
-        return self.private_key
+        return self._private_key
+
+
+# Keys used to be stored as hex; a 32-byte key is 64 hex characters but
+# always 44 characters of base64, so the two encodings cannot be confused
+_LEGACY_HEX_KEY_LENGTH = 64
+
+if sys.version_info >= (3, 11):
+    def _b64decode_strict(value: str) -> bytes:
+        """Decode base64, rejecting any character outside the alphabet"""
+        # Same validation as b64decode(validate=True), minus its Python-level
+        # regex pass over the input
+        return binascii.a2b_base64(value, strict_mode=True)
+else:
+    def _b64decode_strict(value: str) -> bytes:
+        """Decode base64, rejecting any character outside the alphabet"""
+        return base64.b64decode(value, validate=True)
+
+
+def encode_key_bytes(key: bytes) -> str:
+    """
+    Encode raw key bytes as a base64 string for storage.
+
+    Args:
+        key: Raw key bytes
+
+    Returns:
+        str: ASCII base64 encoding of the key
+    """
+    return binascii.b2a_base64(key, newline=False).decode('ascii')
+
+
+def decode_key_bytes(value: str) -> bytes:
+    """
+    Decode key bytes produced by encode_key_bytes.
+
+    Legacy hex-encoded 32-byte keys are still accepted.
+
+    Args:
+        value: base64 (or legacy hex) encoded key
+
+    Returns:
+        bytes: Raw key bytes
+    """
+    if len(value) == _LEGACY_HEX_KEY_LENGTH:
+        return binascii.unhexlify(value)
+    return _b64decode_strict(value)
+
+
+# Curve25519 clamping expressed as masks over the little-endian scalar:
+# - Clear the lowest 3 bits of the first byte
+# - Clear the highest bit and set the second highest bit of the last byte
+_CLAMP_AND = (1 << 256) - 1 - 0x07 - (0x80 << (31 * 8))
+_CLAMP_OR = 0x40 << (31 * 8)
 
 
 def clamp_curve25519_private_key(key: bytes) -> bytes:
@@ -70,17 +192,10 @@ def clamp_curve25519_private_key(key: bytes) -> bytes:
     if len(key) != 32:
         raise ValueError("Key must be 32 bytes")
 
-    # Convert to bytearray for easy manipulation
-    key_array = bytearray(key)
-
-    # Apply Curve25519 clamping:
-    # - Clear the lowest 3 bits of the first byte
-    # - Clear the highest bit and set the second highest bit of the last byte
-    key_array[0] &= 0xF8  # Clear lowest 3 bits
-    key_array[31] &= 0x7F  # Clear highest bit
-    key_array[31] |= 0x40  # Set second highest bit
-
-    return bytes(key_array)
+    # Apply both masks to the key as one integer instead of patching
+    # individual bytes of a bytearray copy
+    value = int.from_bytes(key, 'little')
+    return ((value & _CLAMP_AND) | _CLAMP_OR).to_bytes(32, 'little')
 
 
 def generate_key_pair() -> tuple[bytes, bytes]:
@@ -91,6 +206,8 @@ def generate_key_pair() -> tuple[bytes, bytes]:
     Returns:
         tuple: (public_key, private_key) as bytes
     """
+    import nacl.public
+
     # Use PyNaCl's official implementation
     private_key_obj = nacl.public.PrivateKey.generate()
 
@@ -98,12 +215,12 @@ def generate_key_pair() -> tuple[bytes, bytes]:
     private_key = private_key_obj.encode()  # Returns 32 bytes
     public_key = private_key_obj.public_key.encode()  # Returns 32 bytes
 
-    # Ensure private key is properly clamped for Curve25519
+    # PyNaCl returns the raw random scalar, so clamp it for storage.
+    # X25519 clamps internally when deriving the public key, so the public
+    # key PyNaCl already computed matches the clamped scalar and does not
+    # need to be re-derived.
     private_key = clamp_curve25519_private_key(private_key)
 
-    # Regenerate public key from clamped private key to ensure consistency
-    public_key = nacl.bindings.crypto_scalarmult_base(private_key)
-
     return public_key, private_key
 
 
@@ -115,8 +232,10 @@ def generate_key_pair_manual() -> tuple[bytes, bytes]:
     Returns:
         tuple: (public_key, private_key) as bytes
     """
-    # Generate a random 32-byte private key
-    private_key = os.urandom(32)
+    import nacl.bindings
+
+    # Take a random 32-byte private key from the entropy pool
+    private_key = _pool.take(32)
 
     # Clamp the private key as required by Curve25519
     private_key = clamp_curve25519_private_key(private_key)
@@ -127,6 +246,61 @@ def generate_key_pair_manual() -> tuple[bytes, bytes]:
     return public_key, private_key
 
 
+# Smallest share of a batch worth handing to a worker thread; below this
+# the thread start-up costs more than the scalar multiplications it saves
+_MIN_KEYS_PER_WORKER = 128
+
+
+def _public_keys(private_keys: list[bytes]) -> list[bytes]:
+    """Derive the Curve25519 public key for each private key"""
+    import nacl.bindings
+
+    scalarmult_base = nacl.bindings.crypto_scalarmult_base
+    return [scalarmult_base(private_key) for private_key in private_keys]
+
+
+def generate_key_pairs(count: int) -> list[tuple[bytes, bytes]]:
+    """
+    Generate several Curve25519 key pairs at once.
+
+    The private keys for the whole batch come from a single os.urandom call
+    instead of one random call per key. Unlike the pool behind
+    generate_key_pair_manual, none of those bytes outlive the call. Large
+    batches derive their public keys on several threads; libsodium releases
+    the GIL while it runs.
+
+    Args:
+        count: Number of key pairs to generate
+
+    Returns:
+        list: (public_key, private_key) tuples as bytes
+    """
+    if count <= 0:
+        return []
+
+    randomness = os.urandom(32 * count)
+    private_keys = [
+        clamp_curve25519_private_key(randomness[offset:offset + 32])
+        for offset in range(0, 32 * count, 32)
+    ]
+
+    workers = min(os.cpu_count() or 1, count // _MIN_KEYS_PER_WORKER)
+    if workers > 1:
+        from concurrent.futures import ThreadPoolExecutor
+
+        step = -(-count // workers)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            chunks = executor.map(
+                _public_keys,
+                [private_keys[i:i + step] for i in range(0, count, step)]
+            )
+            public_keys = [public_key for chunk in chunks for public_key in chunk]
+    else:
+        public_keys = _public_keys(private_keys)
+
+    return list(zip(public_keys, private_keys))
+
+
 def generate_key_pair_from_seed(seed: bytes) -> tuple[bytes, bytes]:
     """
     Generate a Curve25519 key pair from a deterministic seed.
@@ -141,6 +315,8 @@ def generate_key_pair_from_seed(seed: bytes) -> tuple[bytes, bytes]:
     if len(seed) != 32:
         raise ValueError("Seed must be 32 bytes")
 
+    import nacl.bindings
+
     # Use the seed as private key base, then clamp it
     private_key = clamp_curve25519_private_key(seed)
 
@@ -187,14 +363,15 @@ def compare_key_generation_methods() -> dict:
     test_seed = b'0' * 32
     seed_pub, seed_priv = generate_key_pair_from_seed(test_seed)
 
+    # Sample the pairs from the last iteration instead of generating more
     results['sample_keys'] = {
         'nacl_method': {
-            'public': generate_key_pair()[0].hex()[:32] + '...',
-            'private': generate_key_pair()[1].hex()[:32] + '...'
+            'public': nacl_pub.hex()[:32] + '...',
+            'private': nacl_priv.hex()[:32] + '...'
         },
         'manual_method': {
-            'public': generate_key_pair_manual()[0].hex()[:32] + '...',
-            'private': generate_key_pair_manual()[1].hex()[:32] + '...'
+            'public': manual_pub.hex()[:32] + '...',
+            'private': manual_priv.hex()[:32] + '...'
         },
         'deterministic_seed': {
             'public': seed_pub.hex(),
@@ -209,6 +386,8 @@ if __name__ == "__main__":
     """
     测试和比较不同的密钥生成方法
     """
+    import nacl.bindings
+
     print("🔑 Curve25519 密钥生成方法对比测试")
     print("=" * 50)
 
@@ -229,6 +408,12 @@ if __name__ == "__main__":
     print(f"   私钥长度: {len(manual_priv)} bytes")
     print(f"   公钥示例: {manual_pub.hex()[:32]}...")
 
+    # 批量生成
+    batch = generate_key_pairs(8)
+    assert len(batch) == 8 and len({priv for _, priv in batch}) == 8
+    assert all(nacl.bindings.crypto_scalarmult_base(priv) == pub for pub, priv in batch)
+    print(f"✅ 批量生成方法: {len(batch)} 个密钥对，公钥与私钥一致")
+
     # 2. 确定性种子测试
     print(f"\n2️⃣ 确定性种子测试:")
     test_seed = b'Signal Protocol Test Seed 123456'  # Exactly 32 bytes
@@ -250,6 +435,10 @@ if __name__ == "__main__":
     nacl_properly_clamped = nacl_reclamped == nacl_priv
     print(f"✅ PyNaCl 私钥钳制: {'正确' if nacl_properly_clamped else '需要修正'}")
 
+    # 公钥必须与钳制后的私钥一致 (generate_key_pair 不再重新计算公钥)
+    assert nacl.bindings.crypto_scalarmult_base(nacl_priv) == nacl_pub
+    print("✅ PyNaCl 公钥与钳制后私钥一致")
+
     # 检查手动方法生成的私钥钳制
     manual_reclamped = clamp_curve25519_private_key(manual_priv)
     manual_properly_clamped = manual_reclamped == manual_priv
@@ -277,24 +466,30 @@ if __name__ == "__main__":
     # 5. 性能对比 (简单测试)
     print(f"\n5️⃣ 性能对比测试:")
 
-    import time
-
-    # PyNaCl 方法性能
-    start_time = time.time()
-    for _ in range(1000):
-        generate_key_pair()
-    nacl_time = time.time() - start_time
-
-    # 手动方法性能
-    start_time = time.time()
-    for _ in range(1000):
-        generate_key_pair_manual()
-    manual_time = time.time() - start_time
-
-    print(f"✅ 1000次生成性能:")
-    print(f"   PyNaCl 官方方法: {nacl_time:.4f}秒")
-    print(f"   手动实现方法: {manual_time:.4f}秒")
-    print(f"   性能比: {manual_time/nacl_time:.2f}x")
+    # 性能测试较慢，只在显式传入 --bench 时运行
+    if '--bench' in sys.argv:
+        import time
+
+        iterations = 1000
+
+        # PyNaCl 方法性能
+        start_time = time.time()
+        for _ in range(iterations):
+            generate_key_pair()
+        nacl_time = time.time() - start_time
+
+        # 手动方法性能
+        start_time = time.time()
+        for _ in range(iterations):
+            generate_key_pair_manual()
+        manual_time = time.time() - start_time
+
+        print(f"✅ {iterations}次生成性能:")
+        print(f"   PyNaCl 官方方法: {nacl_time:.4f}秒")
+        print(f"   手动实现方法: {manual_time:.4f}秒")
+        print(f"   性能比: {manual_time/nacl_time:.2f}x")
+    else:
+        print("⏭️  已跳过 (使用 --bench 参数运行性能测试)")
 
     # 6. 推荐总结
     print(f"\n🎯 推荐使用:")
@@ -1,14 +1,114 @@
-import nacl.signing
-from .base_key import BaseKey, BaseKeyPair, generate_key_pair
+import hashlib
+import os
+from functools import lru_cache
+from typing import TYPE_CHECKING, Dict, Optional, Sequence, Tuple
+
+from .base_key import (
+    BaseKey,
+    BaseKeyPair,
+    clamp_curve25519_private_key,
+    decode_key_bytes,
+    encode_key_bytes,
+    generate_key_pair
+)
+
+# nacl is imported inside the functions that need it, as in base_key, so
+# that importing the public-only IdentityKey does not load libsodium
+if TYPE_CHECKING:
+    import nacl.signing
+
+# Field prime shared by Curve25519 and Ed25519
+_P = 2**255 - 19
+
+# hash_1 from the XEdDSA spec: SHA-512 prefixed with 0xFE and 31 0xFF bytes
+_HASH1_PREFIX = b'\xfe' + b'\xff' * 31
+
+
+@lru_cache(maxsize=1024)
+def _verify_key(ed25519_verify_key: bytes) -> 'nacl.signing.VerifyKey':
+    """Build (and cache) the VerifyKey for some verify key bytes"""
+    import nacl.signing
+
+    return nacl.signing.VerifyKey(ed25519_verify_key)
+
+
+@lru_cache(maxsize=1024)
+def _montgomery_to_edwards(public_key: bytes) -> bytes:
+    """
+    Convert a Curve25519 public key to the XEdDSA Ed25519 verify key.
+
+    Results are cached per public key, so identity keys built from the same
+    bytes share the conversion without sharing any object state.
+
+    Uses the birational map y = (u - 1) / (u + 1) mod p with the sign bit
+    of the result set to 0, as the XEdDSA spec does for verification.
+
+    Args:
+        public_key: 32-byte Curve25519 public key (u-coordinate)
+
+    Returns:
+        bytes: 32-byte Ed25519 verify key
+
+    Raises:
+        ValueError: If the u-coordinate is not a canonical field element or
+            has no Edwards equivalent
+    """
+    u = int.from_bytes(public_key, 'little')
+    if u >= _P or u == _P - 1:
+        raise ValueError("Public key has no Ed25519 equivalent")
+    y = (u - 1) * pow(u + 1, -1, _P) % _P
+    return y.to_bytes(32, 'little')
+
+
+def _calculate_key_pair(private_key: bytes) -> Tuple[bytes, bytes]:
+    """
+    Convert a Curve25519 private key into an XEdDSA Edwards key pair.
+
+    This is calculate_key_pair from the XEdDSA spec: E = kB, the public key
+    A is E with the sign bit cleared and the scalar a is negated whenever E
+    had the sign bit set, so that A = aB always holds.
+
+    Args:
+        private_key: 32-byte Curve25519 private key
+
+    Returns:
+        tuple: (A, a) as 32-byte little-endian encodings
+    """
+    import nacl.bindings
+
+    # All arithmetic on the secret scalar goes through libsodium's
+    # constant-time scalar functions instead of Python ints
+    k = nacl.bindings.crypto_core_ed25519_scalar_reduce(
+        clamp_curve25519_private_key(private_key) + bytes(32))
+    edwards_public = nacl.bindings.crypto_scalarmult_ed25519_base_noclamp(k)
+
+    if edwards_public[31] & 0x80:
+        k = nacl.bindings.crypto_core_ed25519_scalar_negate(k)
+        edwards_public = edwards_public[:31] + bytes([edwards_public[31] & 0x7F])
+    return edwards_public, k
 
 
 class IdentityKeyPair(BaseKeyPair):
     """Represents an identity key pair in the Signal Protocol
 
-    This uses Curve25519 keys for ECDH key exchange and stores the corresponding
-    Ed25519 verify key for XEdDSA signature verification.
+    This uses Curve25519 keys for ECDH key exchange and derives the
+    corresponding XEdDSA Edwards key pair for signing and verification.
     """
 
+    __slots__ = (
+        '_xeddsa_private_scalar',
+        '_ed25519_verify_key_bytes',
+        '_ed25519_verify_key',
+        '_encoded',
+        '_signed_pre_key_signatures'
+    )
+
+    # Encoded (public, private, verify) keys, filled in on first serialize
+    _encoded: Optional[Tuple[str, str, str]]
+
+    # Most recent signatures over signed pre-key public keys, oldest first
+    _signed_pre_key_signatures: Dict[bytes, bytes]
+
     def __init__(self, public_key: bytes, private_key: bytes, ed25519_verify_key: bytes = None):
         """
         Initialize an identity key pair.
@@ -16,27 +116,30 @@ class IdentityKeyPair(BaseKeyPair):
         Args:
             public_key: 32-byte Curve25519 public key
             private_key: 32-byte Curve25519 private key
-            ed25519_verify_key: 32-byte Ed25519 verify key (optional, will be derived if not provided)
+            ed25519_verify_key: 32-byte Ed25519 verify key (optional, checked
+                against the one derived from the private key if provided)
         """
         super().__init__(public_key, private_key)
 
-        # Store or derive the Ed25519 verify key
-        if ed25519_verify_key is not None:
-            self._ed25519_verify_key_bytes = ed25519_verify_key
-        else:
-            # Derive Ed25519 verify key from the private key
-            signing_key = nacl.signing.SigningKey(private_key)
-            self._ed25519_verify_key_bytes = bytes(signing_key.verify_key)
+        # Convert the Curve25519 private key once; every signature reuses
+        # the Edwards scalar
+        verify_key_bytes, self._xeddsa_private_scalar = _calculate_key_pair(private_key)
+        if ed25519_verify_key is not None and bytes(ed25519_verify_key) != verify_key_bytes:
+            raise ValueError("Ed25519 verify key does not match the private key")
 
-    @property
-    def ed25519_signing_key(self) -> nacl.signing.SigningKey:
-        """Get the Ed25519 signing key derived from the Curve25519 private key"""
-        return nacl.signing.SigningKey(self.private_key_bytes)
+        self._ed25519_verify_key_bytes = verify_key_bytes
+        self._ed25519_verify_key = _verify_key(verify_key_bytes)
+
+        # Encoded (public, private, verify) keys, filled in on first serialize
+        self._encoded = None
+
+        # Signed pre-key public key -> signature, see sign_signed_pre_key
+        self._signed_pre_key_signatures = {}
 
     @property
-    def ed25519_verify_key(self) -> nacl.signing.VerifyKey:
+    def ed25519_verify_key(self) -> 'nacl.signing.VerifyKey':
         """Get the Ed25519 verify key"""
-        return nacl.signing.VerifyKey(self._ed25519_verify_key_bytes)
+        return self._ed25519_verify_key
 
     @property
     def ed25519_verify_key_bytes(self) -> bytes:
@@ -47,6 +150,11 @@ class IdentityKeyPair(BaseKeyPair):
 class IdentityKey(BaseKey):
     """Represents an identity key (public only) in the Signal Protocol"""
 
+    __slots__ = ('_ed25519_verify_key_bytes',)
+
+    # Converted from the public key on first use
+    _ed25519_verify_key_bytes: Optional[bytes]
+
     def __init__(self, public_key: bytes):
         """
         Initialize an identity key.
@@ -55,6 +163,14 @@ class IdentityKey(BaseKey):
             public_key: 32-byte public key
         """
         super().__init__(public_key)
+        self._ed25519_verify_key_bytes = None
+
+    @property
+    def ed25519_verify_key_bytes(self) -> bytes:
+        """Get the XEdDSA Ed25519 verify key derived from the public key"""
+        if self._ed25519_verify_key_bytes is None:
+            self._ed25519_verify_key_bytes = _montgomery_to_edwards(bytes(self.public_key))
+        return self._ed25519_verify_key_bytes
 
 
 def generate_identity_key_pair() -> IdentityKeyPair:
@@ -72,6 +188,9 @@ def xeddsa_sign(identity_key_pair: IdentityKeyPair, message: bytes) -> bytes:
     """
     Sign a message using XEdDSA (Ed25519-compatible signatures with Curve25519 keys).
 
+    Signatures are randomized with 64 bytes of fresh randomness as in the
+    XEdDSA spec, so signing the same message twice gives different results.
+
     Args:
         identity_key_pair: The identity key pair to sign with
         message: The message to sign
@@ -79,14 +198,22 @@ def xeddsa_sign(identity_key_pair: IdentityKeyPair, message: bytes) -> bytes:
     Returns:
         bytes: The signature (64 bytes)
     """
-    # Use the Ed25519 signing key derived from the Curve25519 private key
-    signing_key = identity_key_pair.ed25519_signing_key
+    import nacl.bindings
 
-    # Sign the message
-    signed_message = signing_key.sign(message)
+    a = identity_key_pair._xeddsa_private_scalar
+    verify_key_bytes = identity_key_pair._ed25519_verify_key_bytes
 
-    # Return only the signature part (64 bytes)
-    return signed_message.signature
+    # r = hash_1(a || M || Z) mod q
+    nonce = hashlib.sha512(_HASH1_PREFIX + a + message + os.urandom(64)).digest()
+    r = nacl.bindings.crypto_core_ed25519_scalar_reduce(nonce)
+    R = nacl.bindings.crypto_scalarmult_ed25519_base_noclamp(r)
+
+    # h = hash(R || A || M) mod q, s = r + h * a mod q, all in constant time
+    h = nacl.bindings.crypto_core_ed25519_scalar_reduce(
+        hashlib.sha512(R + verify_key_bytes + message).digest())
+    s = nacl.bindings.crypto_core_ed25519_scalar_add(
+        r, nacl.bindings.crypto_core_ed25519_scalar_mul(h, a))
+    return R + s
 
 
 def xeddsa_verify(ed25519_verify_key: bytes, message: bytes, signature: bytes) -> bool:
@@ -102,8 +229,8 @@ def xeddsa_verify(ed25519_verify_key: bytes, message: bytes, signature: bytes) -
         bool: True if the signature is valid, False otherwise
     """
     try:
-        # Create the verify key from the Ed25519 verify key bytes
-        verify_key = nacl.signing.VerifyKey(ed25519_verify_key)
+        # Reuse the cached verify key for the Ed25519 verify key bytes
+        verify_key = _verify_key(bytes(ed25519_verify_key))
 
         # Verify the signature
         verify_key.verify(message, signature)
@@ -112,6 +239,42 @@ def xeddsa_verify(ed25519_verify_key: bytes, message: bytes, signature: bytes) -
         return False
 
 
+def xeddsa_verify_batch(
+    ed25519_verify_keys: Sequence[bytes],
+    messages: Sequence[bytes],
+    signatures: Sequence[bytes]
+) -> bool:
+    """
+    Verify a batch of XEdDSA signatures.
+
+    There is no multi-scalar batch verifier available through PyNaCl, so each
+    signature is still checked individually. Verify keys come from the same
+    cache as xeddsa_verify, which helps the common case of many pre-keys
+    signed by a single identity, and verification stops at the first invalid
+    signature.
+
+    Args:
+        ed25519_verify_keys: The Ed25519 verify keys (32 bytes each)
+        messages: The messages that were signed
+        signatures: The signatures to verify (64 bytes each)
+
+    Returns:
+        bool: True if every signature is valid, False otherwise
+
+    Raises:
+        ValueError: If the three sequences have different lengths
+    """
+    if not len(ed25519_verify_keys) == len(messages) == len(signatures):
+        raise ValueError("Verify keys, messages and signatures must have the same length")
+
+    for key_bytes, message, signature in zip(ed25519_verify_keys, messages, signatures):
+        try:
+            _verify_key(bytes(key_bytes)).verify(message, signature)
+        except Exception:
+            return False
+    return True
+
+
 def serialize_identity_key_pair(key_pair: IdentityKeyPair) -> dict:
     """
     Serialize an identity key pair to a dictionary for storage.
@@ -122,10 +285,19 @@ def serialize_identity_key_pair(key_pair: IdentityKeyPair) -> dict:
     Returns:
         dict: Dictionary containing the serialized key pair
     """
+    # The keys never change after construction, so encode them only once
+    encoded = key_pair._encoded
+    if encoded is None:
+        encoded = key_pair._encoded = (
+            encode_key_bytes(key_pair.public_key_bytes),
+            encode_key_bytes(key_pair.private_key_bytes),
+            encode_key_bytes(key_pair.ed25519_verify_key_bytes)
+        )
+
     return {
-        'public_key': key_pair.public_key_bytes.hex(),
-        'private_key': key_pair.private_key_bytes.hex(),
-        'ed25519_verify_key': key_pair.ed25519_verify_key_bytes.hex()
+        'public_key': encoded[0],
+        'private_key': encoded[1],
+        'ed25519_verify_key': encoded[2]
     }
 
 
@@ -139,19 +311,18 @@ def deserialize_identity_key_pair(data: dict) -> IdentityKeyPair:
     Returns:
         IdentityKeyPair: The deserialized identity key pair
     """
-    public_key = bytes.fromhex(data['public_key'])
-    private_key = bytes.fromhex(data['private_key'])
-
-    # Handle backward compatibility - if ed25519_verify_key is not present, derive it
-    if 'ed25519_verify_key' in data:
-        ed25519_verify_key = bytes.fromhex(data['ed25519_verify_key'])
-    else:
-        ed25519_verify_key = None
+    public_key = decode_key_bytes(data['public_key'])
+    private_key = decode_key_bytes(data['private_key'])
 
-    return IdentityKeyPair(public_key, private_key, ed25519_verify_key)
+    # The verify key is always re-derived from the private key. Stores
+    # written before XEdDSA was implemented hold a verify key that no longer
+    # matches, and older ones have none at all.
+    return IdentityKeyPair(public_key, private_key)
 
 
 if __name__ == '__main__':
+    from nacl.signing import VerifyKey
+
     # Test identity key pair generation
     print("🔑 Testing identity key pair generation...")
 
@@ -204,6 +375,16 @@ if __name__ == '__main__':
     assert not is_tampered, "Signature should fail for tampered message"
     print("✅ Tampered message correctly rejected")
 
+    # Test batch verification
+    print("\n📚 Testing batch verification...")
+    batch_messages = [b"message %d" % i for i in range(8)]
+    batch_signatures = [xeddsa_sign(identity_key_pair, m) for m in batch_messages]
+    batch_keys = [identity_key_pair.ed25519_verify_key_bytes] * len(batch_messages)
+    assert xeddsa_verify_batch(batch_keys, batch_messages, batch_signatures)
+    assert not xeddsa_verify_batch(
+        batch_keys, batch_messages, batch_signatures[:-1] + [invalid_signature])
+    print("✅ Batch verification accepts valid and rejects invalid batches")
+
     # Test serialization and deserialization
     print("\n💾 Testing serialization and deserialization...")
 
@@ -229,6 +410,15 @@ if __name__ == '__main__':
     assert is_deserialized_valid, "Deserialized key pair should work for signing"
     print("✅ Deserialized key pair signing works correctly")
 
+    # Test loading legacy hex-encoded data
+    legacy_data = {name: key_bytes.hex() for name, key_bytes in (
+        ('public_key', identity_key_pair.public_key_bytes),
+        ('private_key', identity_key_pair.private_key_bytes),
+        ('ed25519_verify_key', identity_key_pair.ed25519_verify_key_bytes))}
+    legacy_key_pair = deserialize_identity_key_pair(legacy_data)
+    assert legacy_key_pair.private_key_bytes == identity_key_pair.private_key_bytes
+    print("✅ Legacy hex-encoded key pair loads correctly")
+
     # Test backward compatibility (without ed25519_verify_key in serialized data)
     print("\n🔄 Testing backward compatibility...")
 
@@ -252,37 +442,36 @@ if __name__ == '__main__':
 
     identity_key = IdentityKey(identity_key_pair.public_key_bytes)
     assert identity_key.public_key_bytes == identity_key_pair.public_key_bytes
+    assert identity_key.ed25519_verify_key_bytes == identity_key_pair.ed25519_verify_key_bytes
+    assert xeddsa_verify(identity_key.ed25519_verify_key_bytes, test_message, signature)
     print("✅ IdentityKey class works correctly")
 
     # Test Ed25519 key properties
     print("\n🔐 Testing Ed25519 key properties...")
 
-    # Test signing key property
-    signing_key = identity_key_pair.ed25519_signing_key
-    assert isinstance(signing_key, nacl.signing.SigningKey)
-    print("✅ Ed25519 signing key property works")
-
     # Test verify key property
     verify_key = identity_key_pair.ed25519_verify_key
-    assert isinstance(verify_key, nacl.signing.VerifyKey)
+    assert isinstance(verify_key, VerifyKey)
+    assert identity_key_pair.ed25519_verify_key_bytes[31] & 0x80 == 0, "Sign bit should be clear"
     print("✅ Ed25519 verify key property works")
 
-    # Test cross-compatibility between properties and direct signing
-    property_signature = signing_key.sign(test_message).signature
-    property_verification = xeddsa_verify(
-        identity_key_pair.ed25519_verify_key_bytes, test_message, property_signature)
-    assert property_verification, "Property-based signing should be compatible with xeddsa_verify"
-    print("✅ Property-based signing compatible with XEdDSA verification")
+    # XEdDSA signatures are plain Ed25519 signatures under the verify key
+    verify_key.verify(test_message, signature)
+    second_signature = xeddsa_sign(identity_key_pair, test_message)
+    assert second_signature != signature, "Signatures should be randomized"
+    verify_key.verify(test_message, second_signature)
+    print("✅ XEdDSA signatures verify as Ed25519 and are randomized")
 
     print("\n🎉 All identity key tests passed!")
     print("=" * 60)
     print("Identity Key Features Tested:")
-    print("  ✓ Key pair generation (Curve25519 + Ed25519)")
+    print("  ✓ Key pair generation (Curve25519 + XEdDSA Edwards key)")
     print("  ✓ XEdDSA signing and verification")
     print("  ✓ Signature validation and rejection")
+    print("  ✓ Batch signature verification")
     print("  ✓ Serialization and deserialization")
     print("  ✓ Backward compatibility")
     print("  ✓ Public-only IdentityKey class")
     print("  ✓ Ed25519 key properties")
-    print("  ✓ Cross-compatibility verification")
+    print("  ✓ Randomized Ed25519-compatible signatures")
     print("=" * 60)
@@ -1,23 +1,138 @@
 import json
+import mmap
 import os
-from typing import Optional, Dict, Any, List
+import stat
+from contextlib import contextmanager
+from types import ModuleType
+from typing import BinaryIO, Optional, Dict, Any, Iterator, List, Tuple
 from .identity_key import IdentityKeyPair, serialize_identity_key_pair, deserialize_identity_key_pair
 from .pre_keys.base_pre_key import (
     PreKeyPair,
-    generate_pre_key_pair,
     serialize_pre_key_pair,
     deserialize_pre_key_pair
 )
 from .pre_keys.signed_pre_key import (
     SignedPreKeyPair,
-    SignedPreKey,
     serialize_signed_pre_key_pair,
     deserialize_signed_pre_key_pair
 )
 
 
+# orjson is optional, install the "fast" extra to use it
+orjson: Optional[ModuleType]
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# (mtime in ns, size) of a file, or None if it doesn't exist
+_FileStat = Optional[Tuple[int, int]]
+
+# Sections of the store that are keyed by key ID
+_KEY_ID_SECTIONS = ('pre_keys', 'signed_pre_keys')
+
+# The write-ahead log is folded into the snapshot once it is larger than
+# both this many bytes and _WAL_COMPACT_RATIO times the snapshot
+_WAL_COMPACT_MIN_BYTES = 64 * 1024
+_WAL_COMPACT_RATIO = 2
+
+
+def _dumps(obj: Any) -> bytes:
+    """Encode an object as compact JSON, with orjson when it is installed"""
+    # Both encoders write int key IDs as JSON string keys
+    if orjson is not None:
+        raw: bytes = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        return raw
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def _loads(raw: bytes) -> Any:
+    """Decode JSON, with orjson when it is installed"""
+    # orjson.JSONDecodeError is a subclass of json.JSONDecodeError
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def _fsync_directory(path: str) -> None:
+    """Flush the directory entry of path to disk (a no-op where unsupported)"""
+    if not hasattr(os, 'O_DIRECTORY'):
+        # Directories can't be opened for fsync on Windows
+        return
+    fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _put(section: str, value: Any, key_id: Optional[int] = None) -> Dict[str, Any]:
+    """Build a log record that stores a value (under key_id, if given)"""
+    return {'op': 'put', 'section': section, 'key_id': key_id, 'value': value}
+
+
+def _delete(section: str, key_id: int) -> Dict[str, Any]:
+    """Build a log record that removes key_id from a section"""
+    return {'op': 'del', 'section': section, 'key_id': key_id}
+
+
+def _apply_record(data: Dict[str, Any], record: Dict[str, Any]) -> None:
+    """Replay one log record onto the store data"""
+    section, key_id = record['section'], record['key_id']
+    if record['op'] == 'put':
+        if key_id is None:
+            data[section] = record['value']
+        else:
+            data.setdefault(section, {})[key_id] = record['value']
+    else:
+        data.get(section, {}).pop(key_id, None)
+
+
+def _drops_private_key(data: Dict[str, Any], record: Dict[str, Any]) -> bool:
+    """Return True if a log record removes or overwrites a stored key pair"""
+    section, key_id = record['section'], record['key_id']
+    if key_id is None:
+        return section in data
+    return key_id in data.get(section, {})
+
+
+def _truncate_torn_tail(f: BinaryIO) -> None:
+    """Cut a partially written last line off a log opened for update"""
+    end = f.seek(0, os.SEEK_END)
+    if end == 0:
+        return
+    f.seek(end - 1)
+    if f.read(1) == b'\n':
+        return
+
+    # Scan back to the newline that ends the last complete record
+    pos = end
+    while pos > 0:
+        step = min(4096, pos)
+        pos -= step
+        f.seek(pos)
+        newline = f.read(step).rfind(b'\n')
+        if newline != -1:
+            pos += newline + 1
+            break
+    f.truncate(pos)
+
+
 class KeyStore:
-    """Simple file-based key storage mechanism for Signal Protocol keys"""
+    """Simple file-based key storage mechanism for Signal Protocol keys
+
+    The store is a JSON snapshot plus an append-only write-ahead log next
+    to it ('<storage_path>.wal'). Each change appends one JSON line to the
+    log instead of rewriting the whole file; compact() folds the log back
+    into the snapshot, which also happens automatically once the log grows
+    large, and whenever a change removes or replaces a stored key pair so
+    the old private key does not linger in the log.
+
+    Several KeyStore instances may share one path: before writing, an
+    instance re-reads whatever the others changed on disk, so interleaved
+    writes keep each other's keys. Writes from separate processes are not
+    locked against each other, though, so two processes writing at the
+    same moment can still race.
+    """
 
     def __init__(self, storage_path: str):
         """
@@ -27,13 +142,35 @@ class KeyStore:
             storage_path: Path to the storage file
         """
         self.storage_path = storage_path
+        self.wal_path = storage_path + '.wal'
         self._ensure_storage_path()
 
-    def _ensure_storage_path(self):
+        # The store is parsed once here; all reads and updates go through
+        # this dict, which is re-read before a write if the files changed on
+        # disk. Pre-key IDs are ints in memory and only become strings in
+        # the JSON file.
+        self._data = self._load_data()
+        self._snapshot_size: int = self._file_size(self.storage_path)
+
+        # Changes not yet appended to the log, and how many batch() blocks
+        # are holding them back
+        self._pending: List[Dict[str, Any]] = []
+        self._batch_depth = 0
+
+        # Set when a pending change drops a private key; the next flush then
+        # compacts instead of appending
+        self._compact_on_flush = False
+        self._wal_size: int = self._replay_wal()
+
+        # Modification times and sizes of the files as this instance last
+        # saw them, so reload() can tell when another writer changed them
+        self._disk_state: Tuple[_FileStat, ...] = self._stat_files()
+
+    def _ensure_storage_path(self) -> None:
         """Ensure the storage path exists"""
         directory = os.path.dirname(self.storage_path)
-        if directory and not os.path.exists(directory):
-            os.makedirs(directory)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
 
     def save_identity_key_pair(self, key_pair: IdentityKeyPair) -> None:
         """
@@ -45,14 +182,8 @@ class KeyStore:
         # Serialize the key pair
         serialized = serialize_identity_key_pair(key_pair)
 
-        # Load existing data
-        data = self._load_data()
-
-        # Update identity key pair
-        data['identity_key_pair'] = serialized
-
-        # Save data
-        self._save_data(data)
+        # Update identity key pair and log the change
+        self._record(_put('identity_key_pair', serialized))
 
     def load_identity_key_pair(self) -> Optional[IdentityKeyPair]:
         """
@@ -61,8 +192,8 @@ class KeyStore:
         Returns:
             IdentityKeyPair: The loaded identity key pair, or None if not found
         """
-        # Load existing data
-        data = self._load_data()
+        # Use the in-memory copy of the store
+        data = self._data
 
         # Check if identity key pair exists
         if 'identity_key_pair' not in data:
@@ -81,18 +212,8 @@ class KeyStore:
         # Serialize the pre-key pair
         serialized = serialize_pre_key_pair(pre_key_pair)
 
-        # Load existing data
-        data = self._load_data()
-
-        # Initialize pre-keys dict if it doesn't exist
-        if 'pre_keys' not in data:
-            data['pre_keys'] = {}
-
-        # Update pre-key pair
-        data['pre_keys'][str(pre_key_pair.key_id)] = serialized
-
-        # Save data
-        self._save_data(data)
+        # Update pre-key pair and log the change
+        self._record(_put('pre_keys', serialized, pre_key_pair.key_id))
 
     def load_pre_key_pair(self, key_id: int) -> Optional[PreKeyPair]:
         """
@@ -104,20 +225,19 @@ class KeyStore:
         Returns:
             PreKeyPair: The loaded pre-key pair, or None if not found
         """
-        # Load existing data
-        data = self._load_data()
+        # Use the in-memory copy of the store
+        data = self._data
 
         # Check if pre-keys exist
         if 'pre_keys' not in data:
             return None
 
         # Check if the specific pre-key exists
-        key_id_str = str(key_id)
-        if key_id_str not in data['pre_keys']:
+        if key_id not in data['pre_keys']:
             return None
 
         # Deserialize and return the pre-key pair
-        return deserialize_pre_key_pair(data['pre_keys'][key_id_str])
+        return deserialize_pre_key_pair(data['pre_keys'][key_id])
 
     def save_pre_key_pairs(self, pre_key_pairs: List[PreKeyPair]) -> None:
         """
@@ -126,20 +246,11 @@ class KeyStore:
         Args:
             pre_key_pairs: List of pre-key pairs to save
         """
-        # Load existing data
-        data = self._load_data()
-
-        # Initialize pre-keys dict if it doesn't exist
-        if 'pre_keys' not in data:
-            data['pre_keys'] = {}
-
-        # Update pre-key pairs
-        for pre_key_pair in pre_key_pairs:
-            serialized = serialize_pre_key_pair(pre_key_pair)
-            data['pre_keys'][str(pre_key_pair.key_id)] = serialized
-
-        # Save data
-        self._save_data(data)
+        # Update pre-key pairs and log all changes in one append
+        self._record(*(
+            _put('pre_keys', serialize_pre_key_pair(pre_key_pair), pre_key_pair.key_id)
+            for pre_key_pair in pre_key_pairs
+        ))
 
     def load_pre_key_pairs(self) -> List[PreKeyPair]:
         """
@@ -148,48 +259,53 @@ class KeyStore:
         Returns:
             List[PreKeyPair]: List of all pre-key pairs
         """
-        # Load existing data
-        data = self._load_data()
+        return list(self.iter_pre_key_pairs())
 
-        # Check if pre-keys exist
-        if 'pre_keys' not in data:
-            return []
+    def iter_pre_key_pairs(self) -> Iterator[PreKeyPair]:
+        """
+        Iterate over the stored pre-key pairs, deserializing them on demand.
 
-        # Deserialize and return all pre-key pairs
-        pre_key_pairs = []
-        for serialized in data['pre_keys'].values():
-            pre_key_pair = deserialize_pre_key_pair(serialized)
-            pre_key_pairs.append(pre_key_pair)
+        Returns:
+            Iterator[PreKeyPair]: Iterator over all pre-key pairs
+        """
+        for serialized in self._data.get('pre_keys', {}).values():
+            yield deserialize_pre_key_pair(serialized)
+
+    def load_pre_key_ids(self) -> List[int]:
+        """
+        Load the IDs of all stored pre-keys without deserializing the keys.
 
-        return pre_key_pairs
+        Returns:
+            List[int]: IDs of all pre-key pairs
+        """
+        return list(self._data.get('pre_keys', {}))
 
     def remove_pre_key_pair(self, key_id: int) -> bool:
         """
         Remove a pre-key pair from storage.
 
+        The store is compacted, so the removed private key does not stay
+        in the write-ahead log.
+
         Args:
             key_id: The ID of the pre-key to remove
 
         Returns:
             bool: True if the pre-key was removed, False if it didn't exist
         """
-        # Load existing data
-        data = self._load_data()
+        # Use the in-memory copy of the store
+        data = self._data
 
         # Check if pre-keys exist
         if 'pre_keys' not in data:
             return False
 
         # Check if the specific pre-key exists
-        key_id_str = str(key_id)
-        if key_id_str not in data['pre_keys']:
+        if key_id not in data['pre_keys']:
             return False
 
-        # Remove the pre-key
-        del data['pre_keys'][key_id_str]
-
-        # Save data
-        self._save_data(data)
+        # Remove the pre-key and log the change
+        self._record(_delete('pre_keys', key_id))
         return True
 
     def save_signed_pre_key_pair(self, signed_pre_key_pair: SignedPreKeyPair) -> None:
@@ -202,18 +318,8 @@ class KeyStore:
         # Serialize the signed pre-key pair
         serialized = serialize_signed_pre_key_pair(signed_pre_key_pair)
 
-        # Load existing data
-        data = self._load_data()
-
-        # Initialize signed pre-keys dict if it doesn't exist
-        if 'signed_pre_keys' not in data:
-            data['signed_pre_keys'] = {}
-
-        # Update signed pre-key pair
-        data['signed_pre_keys'][str(signed_pre_key_pair.key_id)] = serialized
-
-        # Save data
-        self._save_data(data)
+        # Update signed pre-key pair and log the change
+        self._record(_put('signed_pre_keys', serialized, signed_pre_key_pair.key_id))
 
     def load_signed_pre_key_pair(self, key_id: int) -> Optional[SignedPreKeyPair]:
         """
@@ -225,20 +331,19 @@ class KeyStore:
         Returns:
             SignedPreKeyPair: The loaded signed pre-key pair, or None if not found
         """
-        # Load existing data
-        data = self._load_data()
+        # Use the in-memory copy of the store
+        data = self._data
 
         # Check if signed pre-keys exist
         if 'signed_pre_keys' not in data:
             return None
 
         # Check if the specific signed pre-key exists
-        key_id_str = str(key_id)
-        if key_id_str not in data['signed_pre_keys']:
+        if key_id not in data['signed_pre_keys']:
             return None
 
         # Deserialize and return the signed pre-key pair
-        return deserialize_signed_pre_key_pair(data['signed_pre_keys'][key_id_str])
+        return deserialize_signed_pre_key_pair(data['signed_pre_keys'][key_id])
 
     def load_signed_pre_key_pairs(self) -> List[SignedPreKeyPair]:
         """
@@ -247,50 +352,219 @@ class KeyStore:
         Returns:
             List[SignedPreKeyPair]: List of all signed pre-key pairs
         """
-        # Load existing data
-        data = self._load_data()
-
-        # Check if signed pre-keys exist
-        if 'signed_pre_keys' not in data:
-            return []
+        return list(self.iter_signed_pre_key_pairs())
 
-        # Deserialize and return all signed pre-key pairs
-        signed_pre_key_pairs = []
-        for serialized in data['signed_pre_keys'].values():
-            signed_pre_key_pair = deserialize_signed_pre_key_pair(serialized)
-            signed_pre_key_pairs.append(signed_pre_key_pair)
+    def iter_signed_pre_key_pairs(self) -> Iterator[SignedPreKeyPair]:
+        """
+        Iterate over the stored signed pre-key pairs, deserializing them on demand.
 
-        return signed_pre_key_pairs
+        Returns:
+            Iterator[SignedPreKeyPair]: Iterator over all signed pre-key pairs
+        """
+        for serialized in self._data.get('signed_pre_keys', {}).values():
+            yield deserialize_signed_pre_key_pair(serialized)
 
     def remove_signed_pre_key_pair(self, key_id: int) -> bool:
         """
         Remove a signed pre-key pair from storage.
 
+        The store is compacted, so the removed private key does not stay
+        in the write-ahead log.
+
         Args:
             key_id: The ID of the signed pre-key to remove
 
         Returns:
             bool: True if the signed pre-key was removed, False if it didn't exist
         """
-        # Load existing data
-        data = self._load_data()
+        # Use the in-memory copy of the store
+        data = self._data
 
         # Check if signed pre-keys exist
         if 'signed_pre_keys' not in data:
             return False
 
         # Check if the specific signed pre-key exists
-        key_id_str = str(key_id)
-        if key_id_str not in data['signed_pre_keys']:
+        if key_id not in data['signed_pre_keys']:
             return False
 
-        # Remove the signed pre-key
-        del data['signed_pre_keys'][key_id_str]
+        # Remove the signed pre-key and log the change
+        self._record(_delete('signed_pre_keys', key_id))
+        return True
+
+    def flush(self) -> None:
+        """Append pending changes to the write-ahead log and sync it to disk"""
+        if not self._pending:
+            return
+        # Fold in what other instances wrote since this one last looked, so
+        # a compaction below never drops their records
+        self._catch_up()
+        if self._compact_on_flush:
+            self.compact()
+            return
+
+        raw = b''.join(_dumps(record) + b'\n' for record in self._pending)
+        fd = os.open(
+            self.wal_path,
+            os.O_RDWR | os.O_CREAT | os.O_APPEND | getattr(os, 'O_BINARY', 0),
+            self._file_mode()
+        )
+        with os.fdopen(fd, 'a+b') as f:
+            # Only the writer repairs the log: a torn record left by a crash
+            # is cut off so the new records start on a fresh line
+            _truncate_torn_tail(f)
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+            self._wal_size = f.tell()
+        self._pending.clear()
+        self._disk_state = self._stat_files()
+
+        if (self._wal_size > _WAL_COMPACT_MIN_BYTES
+                and self._wal_size > _WAL_COMPACT_RATIO * self._snapshot_size):
+            self.compact()
+
+    @contextmanager
+    def batch(self) -> Iterator['KeyStore']:
+        """
+        Group changes so they reach disk in one log append and one fsync.
+
+        Changes made inside the block are visible immediately but are only
+        written when the outermost batch() block exits, even if it exits
+        with an exception.
+
+        Returns:
+            Iterator[KeyStore]: Context manager yielding this key store
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if self._batch_depth == 0:
+                self.flush()
+
+    def compact(self) -> None:
+        """Write the whole store as a new snapshot and empty the write-ahead log"""
+        # The log is about to be deleted; first apply any records other
+        # instances appended to it
+        self._catch_up()
+        self._pending.clear()
+        self._compact_on_flush = False
+        self._save_data(self._data)
+        # A crash before the log is removed only replays changes that the
+        # snapshot already holds
+        if os.path.exists(self.wal_path):
+            os.remove(self.wal_path)
+        self._wal_size = 0
+        self._disk_state = self._stat_files()
+
+    def reload(self) -> bool:
+        """
+        Re-read the store if another writer changed it on disk.
 
-        # Save data
-        self._save_data(data)
+        Pending changes from a batch() block are written afterwards.
+
+        Returns:
+            bool: True if the store was re-read, False if it was unchanged
+        """
+        changed = self._catch_up()
+        self.flush()
+        return changed
+
+    def _catch_up(self) -> bool:
+        """
+        Rebuild the in-memory store if the files changed on disk.
+
+        The snapshot and log are re-read and this instance's pending
+        changes are applied again on top, so they still win over older
+        records from other writers.
+
+        Returns:
+            bool: True if the store was re-read, False if it was unchanged
+        """
+        disk_state = self._stat_files()
+        if disk_state == self._disk_state:
+            return False
+
+        self._data = self._load_data()
+        self._snapshot_size = self._file_size(self.storage_path)
+        self._wal_size = self._replay_wal()
+        for record in self._pending:
+            if _drops_private_key(self._data, record):
+                self._compact_on_flush = True
+            _apply_record(self._data, record)
+        self._disk_state = disk_state
         return True
 
+    def _record(self, *records: Dict[str, Any]) -> None:
+        """Apply change records to the in-memory store and log them"""
+        for record in records:
+            if _drops_private_key(self._data, record):
+                self._compact_on_flush = True
+            _apply_record(self._data, record)
+        self._pending.extend(records)
+        if self._batch_depth == 0:
+            self.flush()
+
+    def _replay_wal(self) -> int:
+        """
+        Apply the write-ahead log on top of the loaded snapshot.
+
+        The log is only read here, never modified, since another process
+        may still be appending to it.
+
+        Returns:
+            int: Size of the complete records in the log, in bytes
+        """
+        if not os.path.exists(self.wal_path):
+            return 0
+
+        with open(self.wal_path, 'rb') as f:
+            raw = f.read()
+        size = 0
+        for line in raw.splitlines(keepends=True):
+            # A last line without its newline is torn by a crash mid-append,
+            # even if what was written happens to parse; it was never
+            # acknowledged and the next flush() cuts it off
+            if not line.endswith(b'\n'):
+                break
+            try:
+                record = _loads(line)
+            except json.JSONDecodeError:
+                break
+            _apply_record(self._data, record)
+            size += len(line)
+        return size
+
+    def _stat_files(self) -> Tuple[_FileStat, ...]:
+        """Return (mtime, size) of the snapshot and the log, None if missing"""
+        state: List[_FileStat] = []
+        for path in (self.storage_path, self.wal_path):
+            try:
+                st = os.stat(path)
+            except OSError:
+                state.append(None)
+            else:
+                state.append((st.st_mtime_ns, st.st_size))
+        return tuple(state)
+
+    def _file_mode(self) -> int:
+        """Return the permissions for new store files: the snapshot's, or owner-only"""
+        try:
+            return stat.S_IMODE(os.stat(self.storage_path).st_mode)
+        except OSError:
+            # The files hold private keys, so nobody else may read them
+            return 0o600
+
+    @staticmethod
+    def _file_size(path: str) -> int:
+        """Return the size of a file, or 0 if it doesn't exist"""
+        try:
+            return os.path.getsize(path)
+        except OSError:
+            return 0
+
     def _load_data(self) -> Dict[str, Any]:
         """
         Load data from storage.
@@ -302,10 +576,26 @@ class KeyStore:
             return {}
 
         try:
-            with open(self.storage_path, 'r') as f:
-                return json.load(f)
+            with open(self.storage_path, 'rb') as f:
+                if orjson is not None and os.fstat(f.fileno()).st_size:
+                    # orjson parses straight from the mapped pages, without
+                    # first copying the whole file into a bytes object
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                            memoryview(mm) as view:
+                        data = orjson.loads(view)
+                else:
+                    data = _loads(f.read())
         except (json.JSONDecodeError, IOError):
             return {}
+        if not isinstance(data, dict):
+            # Valid JSON but not a key store, treat it like a corrupt file
+            return {}
+
+        # JSON object keys are always strings; turn the key IDs back into ints
+        for section in _KEY_ID_SECTIONS:
+            if section in data:
+                data[section] = {int(key_id): value for key_id, value in data[section].items()}
+        return data
 
     def _save_data(self, data: Dict[str, Any]) -> None:
         """
@@ -314,8 +604,29 @@ class KeyStore:
         Args:
             data: The data to save
         """
-        with open(self.storage_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        # Compact output: the store is read by code, not people
+        raw = _dumps(data)
+        # Write a temporary file next to the store and rename it over the
+        # store, so a crash mid-write never leaves a truncated key file
+        tmp_path = self.storage_path + '.tmp'
+        mode = self._file_mode()
+        fd = os.open(
+            tmp_path,
+            os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0),
+            mode
+        )
+        with os.fdopen(fd, 'wb') as f:
+            # The rename replaces the store's inode, so carry its permissions
+            # over; a leftover temporary file may have been created with others
+            if hasattr(os, 'fchmod'):
+                os.fchmod(f.fileno(), mode)
+            f.write(raw)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.storage_path)
+        # Make the rename itself durable before compact() drops the log
+        _fsync_directory(self.storage_path)
+        self._snapshot_size = len(raw)
 
 
 def create_key_store(storage_path: str) -> KeyStore:
@@ -334,7 +645,6 @@ def create_key_store(storage_path: str) -> KeyStore:
 if __name__ == '__main__':
     # Test key store functionality
     import tempfile
-    import os
     from .identity_key import generate_identity_key_pair
     from .pre_keys.base_pre_key import generate_pre_keys
     from .pre_keys.signed_pre_key import generate_signed_pre_key_pair
@@ -379,6 +689,12 @@ if __name__ == '__main__':
             pre_key_pairs), "Should load all pre-key pairs"
         print(f"✅ Loaded {len(loaded_pre_key_pairs)} pre-key pairs")
 
+        # Only the IDs, without deserializing any keys
+        assert key_store.load_pre_key_ids() == [1, 2, 3, 4, 5]
+        first_pre_key = next(key_store.iter_pre_key_pairs())
+        assert first_pre_key.key_id == 1
+        print("✅ Listed pre-key IDs and iterated lazily")
+
         # Load specific pre-key pair
         specific_pre_key = key_store.load_pre_key_pair(3)
         assert specific_pre_key is not None, "Should load specific pre-key pair"
@@ -466,6 +782,10 @@ if __name__ == '__main__':
         # Test 6: Storage file verification
         print("\n📁 Testing storage file structure...")
 
+        # Removing a key folds the log into the file, so no removed private
+        # key is left behind in it
+        assert not os.path.exists(key_store.wal_path), "Removal should compact the log"
+
         # Verify the storage file exists and has correct structure
         assert os.path.exists(storage_path), "Storage file should exist"
 
@@ -491,6 +811,7 @@ if __name__ == '__main__':
 
     finally:
         # Clean up temporary file
-        if os.path.exists(storage_path):
-            os.unlink(storage_path)
-            print(f"🧹 Cleaned up temporary storage file")
+        for path in (storage_path, storage_path + '.wal'):
+            if os.path.exists(path):
+                os.unlink(path)
+        print(f"🧹 Cleaned up temporary storage file")
@@ -1,10 +1,23 @@
-from typing import List
-from ..base_key import BaseKey, BaseKeyPair, generate_key_pair
+import struct
+from typing import List, Optional, Tuple
+from ..base_key import (
+    BaseKey,
+    BaseKeyPair,
+    decode_key_bytes,
+    encode_key_bytes,
+    generate_key_pair,
+    generate_key_pairs
+)
 
 
 class PreKeyPair(BaseKeyPair):
     """Represents a pre-key pair in the Signal Protocol"""
 
+    __slots__ = ('key_id', '_encoded')
+
+    # Encoded (public, private) keys, filled in on first serialize
+    _encoded: Optional[Tuple[str, str]]
+
     def __init__(self, key_id: int, public_key: bytes, private_key: bytes):
         """
         Initialize a pre-key pair.
@@ -17,10 +30,15 @@ class PreKeyPair(BaseKeyPair):
         super().__init__(public_key, private_key)
         self.key_id = key_id
 
+        # Encoded (public, private) keys, filled in on first serialize
+        self._encoded = None
+
 
 class PreKey(BaseKey):
     """Represents a pre-key (public only) in the Signal Protocol"""
 
+    __slots__ = ('key_id',)
+
     def __init__(self, key_id: int, public_key: bytes):
         """
         Initialize a pre-key.
@@ -58,12 +76,11 @@ def generate_pre_keys(start_id: int, count: int) -> List[PreKeyPair]:
     Returns:
         List[PreKeyPair]: List of generated pre-key pairs
     """
-    pre_keys = []
-    for i in range(count):
-        pre_key = generate_pre_key_pair(start_id + i)
-        pre_keys.append(pre_key)
-
-    return pre_keys
+    # Draw the randomness for all keys at once
+    return [
+        PreKeyPair(start_id + i, public_key, private_key)
+        for i, (public_key, private_key) in enumerate(generate_key_pairs(count))
+    ]
 
 
 def serialize_pre_key_pair(pre_key_pair: PreKeyPair) -> dict:
@@ -76,10 +93,18 @@ def serialize_pre_key_pair(pre_key_pair: PreKeyPair) -> dict:
     Returns:
         dict: Dictionary containing the serialized pre-key pair
     """
+    # The keys never change after construction, so encode them only once
+    encoded = pre_key_pair._encoded
+    if encoded is None:
+        encoded = pre_key_pair._encoded = (
+            encode_key_bytes(pre_key_pair.public_key_bytes),
+            encode_key_bytes(pre_key_pair.private_key_bytes)
+        )
+
     return {
         'key_id': pre_key_pair.key_id,
-        'public_key': pre_key_pair.public_key_bytes.hex(),
-        'private_key': pre_key_pair.private_key_bytes.hex()
+        'public_key': encoded[0],
+        'private_key': encoded[1]
     }
 
 
@@ -94,12 +119,50 @@ def deserialize_pre_key_pair(data: dict) -> PreKeyPair:
         PreKeyPair: The deserialized pre-key pair
     """
     key_id = data['key_id']
-    public_key = bytes.fromhex(data['public_key'])
-    private_key = bytes.fromhex(data['private_key'])
+    public_key = decode_key_bytes(data['public_key'])
+    private_key = decode_key_bytes(data['private_key'])
 
     return PreKeyPair(key_id, public_key, private_key)
 
 
+# Fixed-size binary record: key ID, public key, private key
+PRE_KEY_PAIR_RECORD = struct.Struct('<I32s32s')
+
+
+def serialize_pre_key_pair_binary(pre_key_pair: PreKeyPair) -> bytes:
+    """
+    Serialize a pre-key pair to a fixed-size binary record.
+
+    Args:
+        pre_key_pair: The pre-key pair to serialize
+
+    Returns:
+        bytes: The 68-byte record
+    """
+    return PRE_KEY_PAIR_RECORD.pack(
+        pre_key_pair.key_id,
+        pre_key_pair.public_key_bytes,
+        pre_key_pair.private_key_bytes
+    )
+
+
+def deserialize_pre_key_pair_binary(data: bytes, offset: int = 0) -> PreKeyPair:
+    """
+    Deserialize a pre-key pair from a binary record.
+
+    Args:
+        data: Buffer holding the record
+        offset: Position of the record in the buffer
+
+    Returns:
+        PreKeyPair: The deserialized pre-key pair
+
+    Raises:
+        struct.error: If the buffer is too short
+    """
+    return PreKeyPair(*PRE_KEY_PAIR_RECORD.unpack_from(data, offset))
+
+
 if __name__ == '__main__':
     # Test generating pre-key pairs
     print("Testing pre-key generation...")
@@ -126,6 +189,13 @@ if __name__ == '__main__':
     assert pre_key_pair.public_key_bytes == deserialized.public_key_bytes
     assert pre_key_pair.private_key_bytes == deserialized.private_key_bytes
 
+    # Test binary records
+    print("\nTesting binary serialization...")
+    record = serialize_pre_key_pair_binary(pre_key_pair)
+    assert len(record) == PRE_KEY_PAIR_RECORD.size
+    assert deserialize_pre_key_pair_binary(record).private_key_bytes == pre_key_pair.private_key_bytes
+    print(f"Binary record: {len(record)} bytes")
+
     # Generate multiple pre-keys
     print("\nTesting multiple pre-key generation...")
     pre_keys = generate_pre_keys(100, 5)
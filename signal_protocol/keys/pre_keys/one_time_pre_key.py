@@ -1,11 +1,13 @@
 from typing import List
 from .base_pre_key import PreKeyPair, PreKey, serialize_pre_key_pair, deserialize_pre_key_pair
-from ..base_key import generate_key_pair
+from ..base_key import generate_key_pair, generate_key_pairs
 
 
 class OneTimePreKeyPair(PreKeyPair):
     """Represents a one-time pre-key pair in the Signal Protocol"""
     
+    __slots__ = ()
+    
     def __init__(self, key_id: int, public_key: bytes, private_key: bytes):
         """
         Initialize a one-time pre-key pair.
@@ -21,6 +23,8 @@ class OneTimePreKeyPair(PreKeyPair):
 class OneTimePreKey(PreKey):
     """Represents a one-time pre-key (public only) in the Signal Protocol"""
     
+    __slots__ = ()
+    
     def __init__(self, key_id: int, public_key: bytes):
         """
         Initialize a one-time pre-key.
@@ -57,12 +61,11 @@ def generate_one_time_pre_keys(start_id: int, count: int) -> List[OneTimePreKeyP
     Returns:
         List[OneTimePreKeyPair]: List of generated one-time pre-key pairs
     """
-    one_time_pre_keys = []
-    for i in range(count):
-        one_time_pre_key = generate_one_time_pre_key_pair(start_id + i)
-        one_time_pre_keys.append(one_time_pre_key)
-    
-    return one_time_pre_keys
+    # Draw the randomness for all keys at once
+    return [
+        OneTimePreKeyPair(start_id + i, public_key, private_key)
+        for i, (public_key, private_key) in enumerate(generate_key_pairs(count))
+    ]
 
 
 # Re-export serialization functions from base_pre_key module
@@ -7,6 +7,17 @@ from .signed_pre_key import generate_signed_pre_key_pair, sign_signed_pre_key
 class PreKeyBundle:
     """Represents a pre-key bundle in the Signal Protocol"""
     
+    __slots__ = (
+        'registration_id',
+        'device_id',
+        'pre_key',
+        'pre_key_id',
+        'signed_pre_key',
+        'signed_pre_key_id',
+        'signed_pre_key_signature',
+        'identity_key'
+    )
+    
     def __init__(
         self,
         registration_id: int,
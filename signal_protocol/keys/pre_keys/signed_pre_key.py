@@ -1,13 +1,28 @@
+import struct
 import time
-from typing import List
-from ..identity_key import IdentityKeyPair, generate_identity_key_pair, xeddsa_sign, xeddsa_verify
+from typing import List, Sequence, Tuple, Union
+from ..identity_key import (
+    IdentityKey,
+    IdentityKeyPair,
+    generate_identity_key_pair,
+    xeddsa_sign,
+    xeddsa_verify,
+    xeddsa_verify_batch
+)
 from .base_pre_key import PreKeyPair, PreKey
-from ..base_key import generate_key_pair
+from ..base_key import decode_key_bytes, encode_key_bytes, generate_key_pair, generate_key_pairs
+
+
+# How many signatures sign_signed_pre_key keeps per identity key pair;
+# only the current signed pre-key and a few predecessors are ever re-signed
+_MAX_CACHED_SIGNATURES = 4
 
 
 class SignedPreKeyPair(PreKeyPair):
     """Represents a signed pre-key pair in the Signal Protocol"""
     
+    __slots__ = ('timestamp',)
+    
     def __init__(self, key_id: int, public_key: bytes, private_key: bytes, timestamp: int):
         """
         Initialize a signed pre-key pair.
@@ -25,6 +40,8 @@ class SignedPreKeyPair(PreKeyPair):
 class SignedPreKey(PreKey):
     """Represents a signed pre-key (public only) in the Signal Protocol"""
     
+    __slots__ = ('timestamp',)
+    
     def __init__(self, key_id: int, public_key: bytes, timestamp: int):
         """
         Initialize a signed pre-key.
@@ -52,11 +69,35 @@ def generate_signed_pre_key_pair(identity_key_pair: IdentityKeyPair, key_id: int
     public_key, private_key = generate_key_pair()
     
     # Get current timestamp
-    timestamp = int(time.time() * 1000)  # milliseconds since epoch
+    timestamp = time.time_ns() // 1_000_000  # milliseconds since epoch
     
     return SignedPreKeyPair(key_id, public_key, private_key, timestamp)
 
 
+def generate_signed_pre_key_pairs(
+    identity_key_pair: IdentityKeyPair,
+    start_id: int,
+    count: int
+) -> List[SignedPreKeyPair]:
+    """
+    Generate multiple signed pre-key pairs.
+    
+    Args:
+        identity_key_pair: The identity key pair to sign with
+        start_id: Starting key ID
+        count: Number of signed pre-key pairs to generate
+        
+    Returns:
+        List[SignedPreKeyPair]: List of generated signed pre-key pairs
+    """
+    # One entropy draw and one clock read for the whole batch
+    timestamp = time.time_ns() // 1_000_000  # milliseconds since epoch
+    return [
+        SignedPreKeyPair(start_id + i, public_key, private_key, timestamp)
+        for i, (public_key, private_key) in enumerate(generate_key_pairs(count))
+    ]
+
+
 def sign_signed_pre_key(
     identity_key_pair: IdentityKeyPair,
     signed_pre_key_pair: SignedPreKeyPair
@@ -64,6 +105,9 @@ def sign_signed_pre_key(
     """
     Sign a signed pre-key with the identity key using XEdDSA.
 
+    Re-signing one of the last few signed public keys with the same
+    identity key pair returns the signature made the first time.
+
     Args:
         identity_key_pair: The identity key pair to sign with
         signed_pre_key_pair: The signed pre-key pair to sign
@@ -71,8 +115,34 @@ def sign_signed_pre_key(
     Returns:
         bytes: The signature (64 bytes)
     """
-    # Use XEdDSA to sign the public key of the signed pre-key
-    return xeddsa_sign(identity_key_pair, signed_pre_key_pair.public_key_bytes)
+    public_key = signed_pre_key_pair.public_key_bytes
+    signatures = identity_key_pair._signed_pre_key_signatures
+    signature = signatures.get(public_key)
+    if signature is None:
+        # Use XEdDSA to sign the public key of the signed pre-key
+        signature = signatures[public_key] = xeddsa_sign(identity_key_pair, public_key)
+        if len(signatures) > _MAX_CACHED_SIGNATURES:
+            del signatures[next(iter(signatures))]
+    return signature
+
+
+def generate_and_sign_signed_pre_key(
+    identity_key_pair: IdentityKeyPair,
+    key_id: int
+) -> Tuple[SignedPreKeyPair, bytes]:
+    """
+    Generate a new signed pre-key pair and sign it with the identity key.
+
+    Args:
+        identity_key_pair: The identity key pair to sign with
+        key_id: Unique identifier for this signed pre-key
+
+    Returns:
+        Tuple[SignedPreKeyPair, bytes]: The signed pre-key pair and its
+            signature (64 bytes)
+    """
+    signed_pre_key_pair = generate_signed_pre_key_pair(identity_key_pair, key_id)
+    return signed_pre_key_pair, sign_signed_pre_key(identity_key_pair, signed_pre_key_pair)
 
 
 def verify_signed_pre_key_signature(
@@ -95,6 +165,32 @@ def verify_signed_pre_key_signature(
     return xeddsa_verify(identity_key_pair.ed25519_verify_key_bytes, signed_pre_key_public_key, signature)
 
 
+def verify_signed_pre_key_signatures_batch(
+    items: Sequence[Tuple[Union[IdentityKey, IdentityKeyPair], bytes, bytes]]
+) -> bool:
+    """
+    Verify the signatures of several signed pre-keys at once.
+
+    Args:
+        items: (identity key, signed pre-key public key, signature) tuples;
+            the identity key may be an IdentityKey or an IdentityKeyPair
+
+    Returns:
+        bool: True if every signature is valid, False otherwise
+    """
+    try:
+        verify_keys = [identity_key.ed25519_verify_key_bytes for identity_key, _, _ in items]
+    except ValueError:
+        # An identity key with no Ed25519 equivalent can't have signed anything
+        return False
+
+    return xeddsa_verify_batch(
+        verify_keys,
+        [public_key for _, public_key, _ in items],
+        [signature for _, _, signature in items]
+    )
+
+
 def serialize_signed_pre_key_pair(signed_pre_key_pair: SignedPreKeyPair) -> dict:
     """
     Serialize a signed pre-key pair to a dictionary for storage.
@@ -105,10 +201,18 @@ def serialize_signed_pre_key_pair(signed_pre_key_pair: SignedPreKeyPair) -> dict
     Returns:
         dict: Dictionary containing the serialized signed pre-key pair
     """
+    # The keys never change after construction, so encode them only once
+    encoded = signed_pre_key_pair._encoded
+    if encoded is None:
+        encoded = signed_pre_key_pair._encoded = (
+            encode_key_bytes(signed_pre_key_pair.public_key_bytes),
+            encode_key_bytes(signed_pre_key_pair.private_key_bytes)
+        )
+
     return {
         'key_id': signed_pre_key_pair.key_id,
-        'public_key': signed_pre_key_pair.public_key_bytes.hex(),
-        'private_key': signed_pre_key_pair.private_key_bytes.hex(),
+        'public_key': encoded[0],
+        'private_key': encoded[1],
         'timestamp': signed_pre_key_pair.timestamp
     }
 
@@ -124,13 +228,52 @@ def deserialize_signed_pre_key_pair(data: dict) -> SignedPreKeyPair:
         SignedPreKeyPair: The deserialized signed pre-key pair
     """
     key_id = data['key_id']
-    public_key = bytes.fromhex(data['public_key'])
-    private_key = bytes.fromhex(data['private_key'])
+    public_key = decode_key_bytes(data['public_key'])
+    private_key = decode_key_bytes(data['private_key'])
     timestamp = data['timestamp']
     
     return SignedPreKeyPair(key_id, public_key, private_key, timestamp)
 
 
+# Fixed-size binary record: key ID, public key, private key, timestamp
+SIGNED_PRE_KEY_PAIR_RECORD = struct.Struct('<I32s32sQ')
+
+
+def serialize_signed_pre_key_pair_binary(signed_pre_key_pair: SignedPreKeyPair) -> bytes:
+    """
+    Serialize a signed pre-key pair to a fixed-size binary record.
+    
+    Args:
+        signed_pre_key_pair: The signed pre-key pair to serialize
+        
+    Returns:
+        bytes: The 76-byte record
+    """
+    return SIGNED_PRE_KEY_PAIR_RECORD.pack(
+        signed_pre_key_pair.key_id,
+        signed_pre_key_pair.public_key_bytes,
+        signed_pre_key_pair.private_key_bytes,
+        signed_pre_key_pair.timestamp
+    )
+
+
+def deserialize_signed_pre_key_pair_binary(data: bytes, offset: int = 0) -> SignedPreKeyPair:
+    """
+    Deserialize a signed pre-key pair from a binary record.
+    
+    Args:
+        data: Buffer holding the record
+        offset: Position of the record in the buffer
+        
+    Returns:
+        SignedPreKeyPair: The deserialized signed pre-key pair
+        
+    Raises:
+        struct.error: If the buffer is too short
+    """
+    return SignedPreKeyPair(*SIGNED_PRE_KEY_PAIR_RECORD.unpack_from(data, offset))
+
+
 if __name__ == "__main__":
     """
     Test the signed pre-key functionality
@@ -159,6 +302,14 @@ if __name__ == "__main__":
     )
     print(f"✅ 签名验证: {'通过' if is_valid else '失败'}")
     
+    # Batch verification against the public identity key
+    identity_key = IdentityKey(identity_key_pair.public_key_bytes)
+    assert verify_signed_pre_key_signatures_batch([
+        (identity_key, signed_pre_key_pair.public_key_bytes, signature),
+        (identity_key_pair, signed_pre_key_pair.public_key_bytes, signature)
+    ])
+    print("✅ 批量签名验证通过")
+    
     # Test serialization
     serialized = serialize_signed_pre_key_pair(signed_pre_key_pair)
     print(f"✅ 序列化成功: {len(serialized)} 字段")
@@ -166,6 +317,11 @@ if __name__ == "__main__":
     deserialized = deserialize_signed_pre_key_pair(serialized)
     print(f"✅ 反序列化成功: ID {deserialized.key_id}")
     
+    # Test binary records
+    record = serialize_signed_pre_key_pair_binary(signed_pre_key_pair)
+    assert deserialize_signed_pre_key_pair_binary(record).timestamp == signed_pre_key_pair.timestamp
+    print(f"✅ 二进制序列化成功: {len(record)} 字节")
+    
     # Create public-only version
     signed_pre_key = SignedPreKey(
         signed_pre_key_pair.key_id,
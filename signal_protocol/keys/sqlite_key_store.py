@@ -0,0 +1,364 @@
+import os
+import sqlite3
+from typing import Any, Iterator, List, Optional, Tuple
+from .identity_key import IdentityKeyPair
+from .pre_keys.base_pre_key import PreKeyPair
+from .pre_keys.signed_pre_key import SignedPreKeyPair
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS identity_key_pair (
+    id INTEGER PRIMARY KEY CHECK (id = 0),
+    public_key BLOB NOT NULL,
+    private_key BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pre_keys (
+    key_id INTEGER PRIMARY KEY,
+    public_key BLOB NOT NULL,
+    private_key BLOB NOT NULL
+);
+CREATE TABLE IF NOT EXISTS signed_pre_keys (
+    key_id INTEGER PRIMARY KEY,
+    public_key BLOB NOT NULL,
+    private_key BLOB NOT NULL,
+    timestamp INTEGER NOT NULL
+);
+"""
+
+
+class SQLiteKeyStore:
+    """SQLite-backed key storage for Signal Protocol keys
+
+    Offers the same methods as KeyStore, but every key is its own row with
+    the key material stored as raw BLOBs. Saving or removing a key touches
+    only that row instead of rewriting the whole store.
+    """
+
+    def __init__(self, storage_path: str):
+        """
+        Initialize the key store.
+
+        Args:
+            storage_path: Path to the SQLite database file
+        """
+        self.storage_path = storage_path
+        self._ensure_storage_path()
+
+        # Autocommit mode: single statements commit on their own and bulk
+        # writes open an explicit transaction
+        self._conn = sqlite3.connect(storage_path, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        # Overwrite deleted rows with zeros so removed private keys don't
+        # linger in free pages (the compile-time default varies by build)
+        self._conn.execute("PRAGMA secure_delete=ON")
+        self._conn.executescript(_SCHEMA)
+
+    def _ensure_storage_path(self) -> None:
+        """Ensure the storage path exists"""
+        directory = os.path.dirname(self.storage_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    def save_identity_key_pair(self, key_pair: IdentityKeyPair) -> None:
+        """
+        Save an identity key pair to storage.
+
+        Args:
+            key_pair: The identity key pair to save
+        """
+        self._save_rows(
+            'identity_key_pair',
+            [(0, key_pair.public_key_bytes, key_pair.private_key_bytes)]
+        )
+
+    def load_identity_key_pair(self) -> Optional[IdentityKeyPair]:
+        """
+        Load the identity key pair from storage.
+
+        Returns:
+            IdentityKeyPair: The loaded identity key pair, or None if not found
+        """
+        row = self._conn.execute(
+            "SELECT public_key, private_key FROM identity_key_pair WHERE id = 0"
+        ).fetchone()
+        if row is None:
+            return None
+        return IdentityKeyPair(row[0], row[1])
+
+    def save_pre_key_pair(self, pre_key_pair: PreKeyPair) -> None:
+        """
+        Save a pre-key pair to storage.
+
+        Args:
+            pre_key_pair: The pre-key pair to save
+        """
+        self._save_rows(
+            'pre_keys',
+            [(pre_key_pair.key_id, pre_key_pair.public_key_bytes, pre_key_pair.private_key_bytes)]
+        )
+
+    def load_pre_key_pair(self, key_id: int) -> Optional[PreKeyPair]:
+        """
+        Load a pre-key pair from storage.
+
+        Args:
+            key_id: The ID of the pre-key to load
+
+        Returns:
+            PreKeyPair: The loaded pre-key pair, or None if not found
+        """
+        row = self._conn.execute(
+            "SELECT key_id, public_key, private_key FROM pre_keys WHERE key_id = ?",
+            (key_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return PreKeyPair(*row)
+
+    def save_pre_key_pairs(self, pre_key_pairs: List[PreKeyPair]) -> None:
+        """
+        Save multiple pre-key pairs to storage in one transaction.
+
+        Args:
+            pre_key_pairs: List of pre-key pairs to save
+        """
+        rows = [
+            (pre_key_pair.key_id, pre_key_pair.public_key_bytes, pre_key_pair.private_key_bytes)
+            for pre_key_pair in pre_key_pairs
+        ]
+        self._save_rows('pre_keys', rows)
+
+    def load_pre_key_pairs(self) -> List[PreKeyPair]:
+        """
+        Load all pre-key pairs from storage.
+
+        Returns:
+            List[PreKeyPair]: List of all pre-key pairs
+        """
+        return list(self.iter_pre_key_pairs())
+
+    def iter_pre_key_pairs(self) -> Iterator[PreKeyPair]:
+        """
+        Iterate over the stored pre-key pairs, reading rows on demand.
+
+        Returns:
+            Iterator[PreKeyPair]: Iterator over all pre-key pairs
+        """
+        cursor = self._conn.execute(
+            "SELECT key_id, public_key, private_key FROM pre_keys ORDER BY key_id"
+        )
+        for row in cursor:
+            yield PreKeyPair(*row)
+
+    def load_pre_key_ids(self) -> List[int]:
+        """
+        Load the IDs of all stored pre-keys without reading the keys.
+
+        Returns:
+            List[int]: IDs of all pre-key pairs
+        """
+        return [row[0] for row in self._conn.execute("SELECT key_id FROM pre_keys ORDER BY key_id")]
+
+    def remove_pre_key_pair(self, key_id: int) -> bool:
+        """
+        Remove a pre-key pair from storage.
+
+        Args:
+            key_id: The ID of the pre-key to remove
+
+        Returns:
+            bool: True if the pre-key was removed, False if it didn't exist
+        """
+        cursor = self._conn.execute("DELETE FROM pre_keys WHERE key_id = ?", (key_id,))
+        if cursor.rowcount == 0:
+            return False
+        self._checkpoint()
+        return True
+
+    def save_signed_pre_key_pair(self, signed_pre_key_pair: SignedPreKeyPair) -> None:
+        """
+        Save a signed pre-key pair to storage.
+
+        Args:
+            signed_pre_key_pair: The signed pre-key pair to save
+        """
+        self._save_rows('signed_pre_keys', [(
+            signed_pre_key_pair.key_id,
+            signed_pre_key_pair.public_key_bytes,
+            signed_pre_key_pair.private_key_bytes,
+            signed_pre_key_pair.timestamp
+        )])
+
+    def load_signed_pre_key_pair(self, key_id: int) -> Optional[SignedPreKeyPair]:
+        """
+        Load a signed pre-key pair from storage.
+
+        Args:
+            key_id: The ID of the signed pre-key to load
+
+        Returns:
+            SignedPreKeyPair: The loaded signed pre-key pair, or None if not found
+        """
+        row = self._conn.execute(
+            "SELECT key_id, public_key, private_key, timestamp FROM signed_pre_keys WHERE key_id = ?",
+            (key_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        return SignedPreKeyPair(*row)
+
+    def load_signed_pre_key_pairs(self) -> List[SignedPreKeyPair]:
+        """
+        Load all signed pre-key pairs from storage.
+
+        Returns:
+            List[SignedPreKeyPair]: List of all signed pre-key pairs
+        """
+        return list(self.iter_signed_pre_key_pairs())
+
+    def iter_signed_pre_key_pairs(self) -> Iterator[SignedPreKeyPair]:
+        """
+        Iterate over the stored signed pre-key pairs, reading rows on demand.
+
+        Returns:
+            Iterator[SignedPreKeyPair]: Iterator over all signed pre-key pairs
+        """
+        cursor = self._conn.execute(
+            "SELECT key_id, public_key, private_key, timestamp FROM signed_pre_keys ORDER BY key_id"
+        )
+        for row in cursor:
+            yield SignedPreKeyPair(*row)
+
+    def remove_signed_pre_key_pair(self, key_id: int) -> bool:
+        """
+        Remove a signed pre-key pair from storage.
+
+        Args:
+            key_id: The ID of the signed pre-key to remove
+
+        Returns:
+            bool: True if the signed pre-key was removed, False if it didn't exist
+        """
+        cursor = self._conn.execute("DELETE FROM signed_pre_keys WHERE key_id = ?", (key_id,))
+        if cursor.rowcount == 0:
+            return False
+        self._checkpoint()
+        return True
+
+    def flush(self) -> None:
+        """Nothing to do: every change is committed as it is made"""
+
+    def close(self) -> None:
+        """Close the database connection"""
+        self._conn.close()
+
+    def _save_rows(self, table: str, rows: List[Tuple[Any, ...]]) -> None:
+        """
+        Insert or replace rows in one transaction.
+
+        Replacing a row drops the private key it held, so the log is then
+        checkpointed just as after a delete.
+
+        Args:
+            table: One of the key tables
+            rows: Rows to store, keyed by their first column
+        """
+        if not rows:
+            return
+
+        placeholders = ', '.join('?' * len(rows[0]))
+        with self._transaction():
+            before = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+            self._conn.executemany(f"INSERT OR REPLACE INTO {table} VALUES ({placeholders})", rows)
+            after = self._conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+
+        # Every row that didn't grow the table replaced an existing key
+        if after - before < len(rows):
+            self._checkpoint()
+
+    def _checkpoint(self) -> None:
+        """
+        Copy the write-ahead log into the database and truncate it.
+
+        Pages holding a deleted or replaced private key stay in the '-wal'
+        file until a checkpoint, even with secure_delete on; only the
+        database file gets the zeroed page.
+        """
+        self._conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def _transaction(self) -> sqlite3.Connection:
+        """
+        Start a transaction that the returned connection's context manager
+        commits (or rolls back on error).
+        """
+        self._conn.execute("BEGIN")
+        return self._conn
+
+
+def create_sqlite_key_store(storage_path: str) -> SQLiteKeyStore:
+    """
+    Create a new SQLite key store.
+
+    Args:
+        storage_path: Path to the SQLite database file
+
+    Returns:
+        SQLiteKeyStore: The new key store
+    """
+    return SQLiteKeyStore(storage_path)
+
+
+if __name__ == '__main__':
+    # 测试 SQLite 密钥存储功能
+    import tempfile
+    from .identity_key import generate_identity_key_pair
+    from .pre_keys.base_pre_key import generate_pre_keys
+    from .pre_keys.signed_pre_key import generate_signed_pre_key_pair
+
+    print("🗄️ Testing SQLiteKeyStore functionality...")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        storage_path = os.path.join(tmp_dir, 'keys.db')
+        key_store = create_sqlite_key_store(storage_path)
+        print(f"✅ Created key store at: {storage_path}")
+
+        # 身份密钥
+        identity_key_pair = generate_identity_key_pair()
+        key_store.save_identity_key_pair(identity_key_pair)
+        loaded_identity_key_pair = key_store.load_identity_key_pair()
+        assert loaded_identity_key_pair is not None, "Should load identity key pair"
+        assert loaded_identity_key_pair.private_key_bytes == identity_key_pair.private_key_bytes
+        print("✅ Saved and loaded identity key pair")
+
+        # 预密钥
+        pre_key_pairs = generate_pre_keys(1, 5)
+        key_store.save_pre_key_pairs(pre_key_pairs)
+        assert key_store.load_pre_key_ids() == [1, 2, 3, 4, 5]
+        loaded_pre_key_pair = key_store.load_pre_key_pair(3)
+        assert loaded_pre_key_pair is not None, "Should load specific pre-key pair"
+        assert loaded_pre_key_pair.public_key_bytes == pre_key_pairs[2].public_key_bytes
+        assert key_store.remove_pre_key_pair(2)
+        assert not key_store.remove_pre_key_pair(2)
+        assert key_store.load_pre_key_pair(2) is None
+        print("✅ Saved, loaded and removed pre-key pairs")
+
+        # 签名预密钥
+        signed_pre_key_pair = generate_signed_pre_key_pair(identity_key_pair, 100)
+        key_store.save_signed_pre_key_pair(signed_pre_key_pair)
+        loaded_signed = key_store.load_signed_pre_key_pair(100)
+        assert loaded_signed is not None, "Should load signed pre-key pair"
+        assert loaded_signed.timestamp == signed_pre_key_pair.timestamp
+        assert key_store.remove_signed_pre_key_pair(100)
+        print("✅ Saved, loaded and removed signed pre-key pair")
+
+        # 持久化
+        key_store.close()
+        reopened = SQLiteKeyStore(storage_path)
+        persisted_identity_key = reopened.load_identity_key_pair()
+        assert persisted_identity_key is not None, "Identity key should persist"
+        assert persisted_identity_key.public_key_bytes == identity_key_pair.public_key_bytes
+        assert len(reopened.load_pre_key_pairs()) == 4
+        reopened.close()
+        print("✅ Data persisted across connections")
+
+    print("\n🎉 All SQLiteKeyStore tests passed!")
@@ -1,12 +1,21 @@
 import os
+import struct
 import unittest
+from unittest import mock
+from nacl.bindings import crypto_scalarmult_base
 from signal_protocol.keys.pre_keys.base_pre_key import (
     PreKeyPair,
     PreKey,
     generate_pre_key_pair,
     generate_pre_keys,
     serialize_pre_key_pair,
-    deserialize_pre_key_pair
+    deserialize_pre_key_pair,
+    serialize_pre_key_pair_binary,
+    deserialize_pre_key_pair_binary
+)
+from signal_protocol.keys.pre_keys.one_time_pre_key import (
+    OneTimePreKey,
+    generate_one_time_pre_key_pair
 )
 
 
@@ -43,6 +52,18 @@ class TestPreKey(unittest.TestCase):
         self.assertEqual(pre_key.public_key_bytes, public_key)
         self.assertEqual(pre_key.key_id, 1)
 
+    def test_pre_keys_have_no_instance_dict(self):
+        """Test that pre-key objects use __slots__ instead of a per-instance dict"""
+        pre_key_pair = generate_pre_key_pair(1)
+        one_time_pre_key_pair = generate_one_time_pre_key_pair(2)
+        for key in (
+            pre_key_pair,
+            PreKey(1, pre_key_pair.public_key_bytes),
+            one_time_pre_key_pair,
+            OneTimePreKey(2, one_time_pre_key_pair.public_key_bytes)
+        ):
+            self.assertFalse(hasattr(key, '__dict__'), type(key).__name__)
+
     def test_invalid_key_sizes(self):
         """Test that invalid key sizes raise ValueError"""
         # Test PreKeyPair with invalid public key size
@@ -69,6 +90,27 @@ class TestPreKey(unittest.TestCase):
         for i, pre_key in enumerate(pre_keys):
             self.assertEqual(pre_key.key_id, 10 + i)
 
+        # Check that every key is distinct and its public key matches
+        self.assertEqual(len({p.private_key_bytes for p in pre_keys}), 5)
+        for pre_key in pre_keys:
+            self.assertEqual(
+                crypto_scalarmult_base(pre_key.private_key_bytes),
+                pre_key.public_key_bytes
+            )
+
+    def test_generate_large_batch_on_several_threads(self):
+        """Test that a batch split across worker threads keeps keys matched"""
+        with mock.patch('signal_protocol.keys.base_key.os.cpu_count', return_value=4):
+            pre_keys = generate_pre_keys(1, 600)
+
+        self.assertEqual([p.key_id for p in pre_keys], list(range(1, 601)))
+        self.assertEqual(len({p.private_key_bytes for p in pre_keys}), 600)
+        for pre_key in pre_keys:
+            self.assertEqual(
+                crypto_scalarmult_base(pre_key.private_key_bytes),
+                pre_key.public_key_bytes
+            )
+
     def test_pre_key_serialization(self):
         """Test serializing and deserializing pre-key pairs"""
         # Generate a pre-key pair
@@ -82,7 +124,7 @@ class TestPreKey(unittest.TestCase):
         self.assertIn('public_key', serialized)
         self.assertIn('private_key', serialized)
 
-        # Check that the keys are hex strings
+        # Check that the keys are base64 strings
         self.assertIsInstance(serialized['public_key'], str)
         self.assertIsInstance(serialized['private_key'], str)
         self.assertIsInstance(serialized['key_id'], int)
@@ -104,6 +146,41 @@ class TestPreKey(unittest.TestCase):
             deserialized_pre_key_pair.private_key_bytes
         )
 
+    def test_pre_key_binary_serialization(self):
+        """Test the fixed-size binary record for pre-key pairs"""
+        pre_key_pairs = generate_pre_keys(1, 3)
+        records = b"".join(serialize_pre_key_pair_binary(p) for p in pre_key_pairs)
+        self.assertEqual(len(records), 3 * 68)
+
+        second = deserialize_pre_key_pair_binary(records, 68)
+        self.assertEqual(second.key_id, 2)
+        self.assertEqual(second.public_key_bytes, pre_key_pairs[1].public_key_bytes)
+        self.assertEqual(second.private_key_bytes, pre_key_pairs[1].private_key_bytes)
+
+        with self.assertRaises(struct.error):
+            deserialize_pre_key_pair_binary(records[:67])
+
+    def test_legacy_hex_pre_key_deserialization(self):
+        """Test that pre-keys stored as hex by older versions still load"""
+        pre_key_pair = generate_pre_key_pair(5)
+        legacy = {
+            'key_id': 5,
+            'public_key': pre_key_pair.public_key_bytes.hex(),
+            'private_key': pre_key_pair.private_key_bytes.hex()
+        }
+
+        deserialized = deserialize_pre_key_pair(legacy)
+        self.assertEqual(pre_key_pair.public_key_bytes, deserialized.public_key_bytes)
+        self.assertEqual(pre_key_pair.private_key_bytes, deserialized.private_key_bytes)
+        self.assertEqual(len(serialize_pre_key_pair(deserialized)['public_key']), 44)
+
+    def test_invalid_base64_is_rejected(self):
+        """Test that keys with characters outside the base64 alphabet fail to load"""
+        serialized = serialize_pre_key_pair(generate_pre_key_pair(6))
+        serialized['public_key'] = serialized['public_key'][:-2] + '$='
+        with self.assertRaises(ValueError):
+            deserialize_pre_key_pair(serialized)
+
 
 if __name__ == '__main__':
     unittest.main()
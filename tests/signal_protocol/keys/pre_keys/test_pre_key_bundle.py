@@ -64,6 +64,7 @@ class TestPreKeyBundle(unittest.TestCase):
 
         # Check that the bundle doesn't have a pre-key
         self.assertFalse(pre_key_bundle.has_pre_key())
+        self.assertFalse(hasattr(pre_key_bundle, '__dict__'))
 
 
 if __name__ == '__main__':
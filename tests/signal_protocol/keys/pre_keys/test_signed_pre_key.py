@@ -3,12 +3,18 @@ from signal_protocol.keys.pre_keys.signed_pre_key import (
     SignedPreKeyPair,
     SignedPreKey,
     generate_signed_pre_key_pair,
+    generate_signed_pre_key_pairs,
+    generate_and_sign_signed_pre_key,
     sign_signed_pre_key,
     verify_signed_pre_key_signature,
+    verify_signed_pre_key_signatures_batch,
     serialize_signed_pre_key_pair,
-    deserialize_signed_pre_key_pair
+    deserialize_signed_pre_key_pair,
+    serialize_signed_pre_key_pair_binary,
+    deserialize_signed_pre_key_pair_binary
 )
 from signal_protocol.keys.identity_key import (
+    IdentityKey,
     IdentityKeyPair,
     generate_identity_key_pair,
     xeddsa_sign,
@@ -36,6 +42,29 @@ class TestSignedPreKey(unittest.TestCase):
         # Check that we have a timestamp
         self.assertIsInstance(signed_pre_key_pair.timestamp, int)
 
+    def test_signed_pre_keys_have_no_instance_dict(self):
+        """Test that signed pre-key objects use __slots__ instead of a per-instance dict"""
+        signed_pre_key_pair = generate_signed_pre_key_pair(generate_identity_key_pair(), 1)
+        signed_pre_key = SignedPreKey(1, signed_pre_key_pair.public_key_bytes, signed_pre_key_pair.timestamp)
+        self.assertFalse(hasattr(signed_pre_key_pair, '__dict__'))
+        self.assertFalse(hasattr(signed_pre_key, '__dict__'))
+
+    def test_generate_multiple_signed_pre_keys(self):
+        """Test generating a batch of signed pre-key pairs"""
+        identity_key_pair = generate_identity_key_pair()
+        signed_pre_key_pairs = generate_signed_pre_key_pairs(identity_key_pair, 10, 4)
+
+        self.assertEqual([p.key_id for p in signed_pre_key_pairs], [10, 11, 12, 13])
+        self.assertEqual(len({p.private_key_bytes for p in signed_pre_key_pairs}), 4)
+        self.assertEqual(len({p.timestamp for p in signed_pre_key_pairs}), 1)
+        for signed_pre_key_pair in signed_pre_key_pairs:
+            self.assertIsInstance(signed_pre_key_pair, SignedPreKeyPair)
+            signature = sign_signed_pre_key(identity_key_pair, signed_pre_key_pair)
+            self.assertTrue(verify_signed_pre_key_signature(
+                identity_key_pair, signed_pre_key_pair.public_key_bytes, signature))
+
+        self.assertEqual(generate_signed_pre_key_pairs(identity_key_pair, 1, 0), [])
+
     def test_sign_and_verify_signed_pre_key(self):
         """Test signing and verifying a signed pre-key using XEdDSA"""
         # Generate an identity key pair
@@ -76,6 +105,61 @@ class TestSignedPreKey(unittest.TestCase):
         )
         self.assertFalse(is_invalid)
 
+    def test_re_signing_reuses_signature(self):
+        """Test that signing the same signed pre-key again returns the first signature"""
+        identity_key_pair = generate_identity_key_pair()
+        signed_pre_key_pair = generate_signed_pre_key_pair(identity_key_pair, 1)
+        signature = sign_signed_pre_key(identity_key_pair, signed_pre_key_pair)
+
+        self.assertEqual(sign_signed_pre_key(identity_key_pair, signed_pre_key_pair), signature)
+
+        # Only the most recent signatures are kept
+        for key_id in range(2, 10):
+            sign_signed_pre_key(
+                identity_key_pair, generate_signed_pre_key_pair(identity_key_pair, key_id))
+        self.assertLessEqual(len(identity_key_pair._signed_pre_key_signatures), 4)
+        self.assertNotIn(signed_pre_key_pair.public_key_bytes, identity_key_pair._signed_pre_key_signatures)
+
+        # A different identity key pair signs the key afresh
+        other_identity = generate_identity_key_pair()
+        other_signature = sign_signed_pre_key(other_identity, signed_pre_key_pair)
+        self.assertNotEqual(other_signature, signature)
+        self.assertTrue(verify_signed_pre_key_signature(
+            other_identity, signed_pre_key_pair.public_key_bytes, other_signature))
+
+    def test_generate_and_sign_signed_pre_key(self):
+        """Test generating and signing a signed pre-key in one call"""
+        identity_key_pair = generate_identity_key_pair()
+        signed_pre_key_pair, signature = generate_and_sign_signed_pre_key(identity_key_pair, 7)
+
+        self.assertIsInstance(signed_pre_key_pair, SignedPreKeyPair)
+        self.assertEqual(signed_pre_key_pair.key_id, 7)
+        self.assertEqual(len(signature), 64)
+        self.assertTrue(verify_signed_pre_key_signature(
+            identity_key_pair, signed_pre_key_pair.public_key_bytes, signature))
+
+    def test_batch_verify_signed_pre_keys(self):
+        """Test verifying several signed pre-key signatures at once"""
+        identity_key_pair = generate_identity_key_pair()
+        identity_key = IdentityKey(identity_key_pair.public_key_bytes)
+        items = []
+        for key_id in range(3):
+            signed_pre_key_pair = generate_signed_pre_key_pair(identity_key_pair, key_id)
+            signature = sign_signed_pre_key(identity_key_pair, signed_pre_key_pair)
+            items.append((identity_key, signed_pre_key_pair.public_key_bytes, signature))
+
+        self.assertTrue(verify_signed_pre_key_signatures_batch(items))
+        self.assertTrue(verify_signed_pre_key_signatures_batch([]))
+
+        # One signature over the wrong key fails the whole batch
+        items[1] = (identity_key, items[0][1], items[1][2])
+        self.assertFalse(verify_signed_pre_key_signatures_batch(items))
+
+        # An identity key with no Ed25519 equivalent fails instead of raising
+        invalid_identity_key = IdentityKey(((2**255 - 19) - 1).to_bytes(32, 'little'))
+        items[1] = (invalid_identity_key, items[1][1], items[1][2])
+        self.assertFalse(verify_signed_pre_key_signatures_batch(items))
+
     def test_xeddsa_direct(self):
         """Test XEdDSA signing and verification directly"""
         # Generate an identity key pair
@@ -125,7 +209,7 @@ class TestSignedPreKey(unittest.TestCase):
         self.assertIn('private_key', serialized)
         self.assertIn('timestamp', serialized)
 
-        # Check that the keys are hex strings
+        # Check that the keys are base64 strings
         self.assertIsInstance(serialized['public_key'], str)
         self.assertIsInstance(serialized['private_key'], str)
         self.assertIsInstance(serialized['key_id'], int)
@@ -153,6 +237,37 @@ class TestSignedPreKey(unittest.TestCase):
             deserialized_signed_pre_key_pair.timestamp
         )
 
+    def test_signed_pre_key_binary_serialization(self):
+        """Test the fixed-size binary record for signed pre-key pairs"""
+        signed_pre_key_pair = generate_signed_pre_key_pair(generate_identity_key_pair(), 9)
+        record = serialize_signed_pre_key_pair_binary(signed_pre_key_pair)
+        self.assertEqual(len(record), 76)
+
+        deserialized = deserialize_signed_pre_key_pair_binary(b"\x00" * 4 + record, 4)
+        self.assertEqual(deserialized.key_id, 9)
+        self.assertEqual(deserialized.public_key_bytes, signed_pre_key_pair.public_key_bytes)
+        self.assertEqual(deserialized.private_key_bytes, signed_pre_key_pair.private_key_bytes)
+        self.assertEqual(deserialized.timestamp, signed_pre_key_pair.timestamp)
+
+    def test_legacy_hex_signed_pre_key_deserialization(self):
+        """Test that signed pre-keys stored as hex by older versions still load"""
+        signed_pre_key_pair = generate_signed_pre_key_pair(generate_identity_key_pair(), 3)
+        legacy = {
+            'key_id': 3,
+            'public_key': signed_pre_key_pair.public_key_bytes.hex(),
+            'private_key': signed_pre_key_pair.private_key_bytes.hex(),
+            'timestamp': signed_pre_key_pair.timestamp
+        }
+
+        deserialized = deserialize_signed_pre_key_pair(legacy)
+        self.assertEqual(signed_pre_key_pair.public_key_bytes, deserialized.public_key_bytes)
+        self.assertEqual(signed_pre_key_pair.private_key_bytes, deserialized.private_key_bytes)
+
+        # Re-serializing writes the base64 form
+        serialized = serialize_signed_pre_key_pair(deserialized)
+        self.assertEqual(len(serialized['public_key']), 44)
+        self.assertEqual(len(serialized['private_key']), 44)
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -6,7 +6,10 @@ from signal_protocol.keys.identity_key import (
     IdentityKey,
     generate_identity_key_pair,
     serialize_identity_key_pair,
-    deserialize_identity_key_pair
+    deserialize_identity_key_pair,
+    xeddsa_sign,
+    xeddsa_verify,
+    xeddsa_verify_batch
 )
 from signal_protocol.keys.key_store import (
     KeyStore,
@@ -43,6 +46,37 @@ class TestIdentityKey(unittest.TestCase):
         self.assertEqual(len(identity_key.public_key_bytes), 32)
         self.assertEqual(identity_key.public_key_bytes, public_key)
 
+    def test_keys_have_no_instance_dict(self):
+        """Test that key objects use __slots__ instead of a per-instance dict"""
+        key_pair = generate_identity_key_pair()
+        identity_key = IdentityKey(key_pair.public_key_bytes)
+        self.assertFalse(hasattr(key_pair, '__dict__'))
+        self.assertFalse(hasattr(identity_key, '__dict__'))
+
+    def test_identity_keys_from_same_bytes_are_independent(self):
+        """Test that identity keys built from the same bytes share no object state"""
+        key_pair = generate_identity_key_pair()
+        first = IdentityKey(key_pair.public_key_bytes)
+        second = IdentityKey(bytearray(key_pair.public_key_bytes))
+
+        self.assertIsNot(first, second)
+        self.assertEqual(first.ed25519_verify_key_bytes, key_pair.ed25519_verify_key_bytes)
+        self.assertEqual(second.ed25519_verify_key_bytes, key_pair.ed25519_verify_key_bytes)
+
+    def test_key_bytes_are_read_only(self):
+        """Test that key bytes cannot be swapped out under cached encodings"""
+        key_pair = generate_identity_key_pair()
+        serialized = serialize_identity_key_pair(key_pair)
+
+        with self.assertRaises(AttributeError):
+            key_pair.private_key = os.urandom(32)
+        with self.assertRaises(AttributeError):
+            key_pair.public_key = os.urandom(32)
+        with self.assertRaises(AttributeError):
+            IdentityKey(key_pair.public_key_bytes).public_key = os.urandom(32)
+
+        self.assertEqual(serialize_identity_key_pair(key_pair), serialized)
+
     def test_invalid_key_sizes(self):
         """Test that invalid key sizes raise ValueError"""
         # Test IdentityKeyPair with invalid public key size
@@ -69,9 +103,10 @@ class TestIdentityKey(unittest.TestCase):
         self.assertIn('public_key', serialized)
         self.assertIn('private_key', serialized)
 
-        # Check that the keys are hex strings
+        # Check that the keys are base64 strings
         self.assertIsInstance(serialized['public_key'], str)
         self.assertIsInstance(serialized['private_key'], str)
+        self.assertEqual(len(serialized['public_key']), 44)
 
         # Deserialize the key pair
         deserialized_key_pair = deserialize_identity_key_pair(serialized)
@@ -86,6 +121,111 @@ class TestIdentityKey(unittest.TestCase):
             deserialized_key_pair.private_key_bytes
         )
 
+    def test_xeddsa_verify_key_matches_curve25519_public_key(self):
+        """Test that the XEdDSA verify key is the Edwards form of the public key"""
+        p = 2**255 - 19
+        for _ in range(8):
+            key_pair = generate_identity_key_pair()
+            u = int.from_bytes(key_pair.public_key_bytes, 'little')
+            y = (u - 1) * pow(u + 1, p - 2, p) % p
+            self.assertEqual(key_pair.ed25519_verify_key_bytes, y.to_bytes(32, 'little'))
+
+    def test_identity_key_verifies_signatures(self):
+        """Test that a public-only identity key can verify XEdDSA signatures"""
+        key_pair = generate_identity_key_pair()
+        identity_key = IdentityKey(key_pair.public_key_bytes)
+        signature = xeddsa_sign(key_pair, b"message")
+
+        self.assertEqual(identity_key.ed25519_verify_key_bytes, key_pair.ed25519_verify_key_bytes)
+        self.assertTrue(xeddsa_verify(identity_key.ed25519_verify_key_bytes, b"message", signature))
+
+        # u = p - 1 has no Edwards equivalent
+        with self.assertRaises(ValueError):
+            IdentityKey(((2**255 - 19) - 1).to_bytes(32, 'little')).ed25519_verify_key_bytes
+
+    def test_xeddsa_signatures_are_randomized(self):
+        """Test that signing twice gives different, valid signatures"""
+        key_pair = generate_identity_key_pair()
+        first = xeddsa_sign(key_pair, b"message")
+        second = xeddsa_sign(key_pair, b"message")
+
+        self.assertNotEqual(first, second)
+        self.assertTrue(xeddsa_verify(key_pair.ed25519_verify_key_bytes, b"message", first))
+        self.assertTrue(xeddsa_verify(key_pair.ed25519_verify_key_bytes, b"message", second))
+
+    def test_xeddsa_verify_rejects_malleable_and_weak_inputs(self):
+        """Test that non-canonical S, small-order keys and non-canonical keys fail"""
+        key_pair = generate_identity_key_pair()
+        verify_key = key_pair.ed25519_verify_key_bytes
+        signature = xeddsa_sign(key_pair, b"message")
+
+        # S + L is the same scalar mod L but not its canonical encoding
+        group_order = 2**252 + 27742317777372353535851937790883648493
+        s = int.from_bytes(signature[32:], 'little') + group_order
+        self.assertFalse(xeddsa_verify(verify_key, b"message", signature[:32] + s.to_bytes(32, 'little')))
+
+        # The identity point as both A and R, with S = 0, satisfies the
+        # verification equation for any message unless small order is rejected
+        identity = (1).to_bytes(32, 'little')
+        self.assertFalse(xeddsa_verify(identity, b"message", identity + bytes(32)))
+
+        # y = p + 1 is a non-canonical encoding of the identity point
+        non_canonical = (2**255 - 19 + 1).to_bytes(32, 'little')
+        self.assertFalse(xeddsa_verify(non_canonical, b"message", identity + bytes(32)))
+
+    def test_mismatched_verify_key(self):
+        """Test that a verify key not matching the private key is rejected"""
+        key_pair = generate_identity_key_pair()
+        other = generate_identity_key_pair()
+        with self.assertRaises(ValueError):
+            IdentityKeyPair(
+                key_pair.public_key_bytes,
+                key_pair.private_key_bytes,
+                other.ed25519_verify_key_bytes
+            )
+
+    def test_xeddsa_verify_batch(self):
+        """Test verifying a batch of XEdDSA signatures"""
+        key_pairs = [generate_identity_key_pair() for _ in range(2)]
+        messages = [b"message %d" % i for i in range(4)]
+        signers = [key_pairs[i % 2] for i in range(4)]
+        keys = [kp.ed25519_verify_key_bytes for kp in signers]
+        signatures = [xeddsa_sign(kp, m) for kp, m in zip(signers, messages)]
+
+        self.assertTrue(xeddsa_verify_batch(keys, messages, signatures))
+        self.assertTrue(xeddsa_verify_batch([], [], []))
+
+        # One bad signature fails the whole batch
+        self.assertFalse(xeddsa_verify_batch(keys, messages, signatures[:3] + [b"\x00" * 64]))
+
+        # Swapped keys fail as well
+        self.assertFalse(xeddsa_verify_batch(keys[::-1], messages, signatures))
+
+        with self.assertRaises(ValueError):
+            xeddsa_verify_batch(keys, messages[:3], signatures)
+
+    def test_deserialize_legacy_hex(self):
+        """Test that hex-encoded key pairs from older stores still load"""
+        original_key_pair = generate_identity_key_pair()
+        legacy = {
+            'public_key': original_key_pair.public_key_bytes.hex(),
+            'private_key': original_key_pair.private_key_bytes.hex(),
+            'ed25519_verify_key': original_key_pair.ed25519_verify_key_bytes.hex()
+        }
+
+        # Verify keys from before XEdDSA are replaced by the derived one
+        legacy['ed25519_verify_key'] = bytes(32).hex()
+
+        deserialized_key_pair = deserialize_identity_key_pair(legacy)
+        self.assertEqual(
+            original_key_pair.private_key_bytes,
+            deserialized_key_pair.private_key_bytes
+        )
+        self.assertEqual(
+            original_key_pair.ed25519_verify_key_bytes,
+            deserialized_key_pair.ed25519_verify_key_bytes
+        )
+
 
 class TestKeyStore(unittest.TestCase):
     def setUp(self):
@@ -95,9 +235,10 @@ class TestKeyStore(unittest.TestCase):
         self.storage_path = self.temp_file.name
 
     def tearDown(self):
-        """Clean up the temporary file"""
-        if os.path.exists(self.storage_path):
-            os.unlink(self.storage_path)
+        """Clean up the temporary file and its write-ahead log"""
+        for path in (self.storage_path, self.storage_path + '.wal'):
+            if os.path.exists(path):
+                os.unlink(path)
 
     def test_key_store_creation(self):
         """Test creating a key store"""
@@ -1,4 +1,6 @@
+import base64
 import os
+import stat
 import tempfile
 import unittest
 from signal_protocol.keys.pre_keys.base_pre_key import (
@@ -22,9 +24,10 @@ class TestPreKeyStorage(unittest.TestCase):
         self.key_store = create_key_store(self.storage_path)
 
     def tearDown(self):
-        """Clean up the temporary file"""
-        if os.path.exists(self.storage_path):
-            os.unlink(self.storage_path)
+        """Clean up the temporary file and its write-ahead log"""
+        for path in (self.storage_path, self.storage_path + '.wal'):
+            if os.path.exists(path):
+                os.unlink(path)
 
     def test_save_and_load_pre_key_pair(self):
         """Test saving and loading a pre-key pair"""
@@ -77,6 +80,32 @@ class TestPreKeyStorage(unittest.TestCase):
                 loaded.private_key_bytes
             )
 
+    def test_iter_pre_key_pairs_and_ids(self):
+        """Test lazily iterating pre-key pairs and listing their IDs"""
+        pre_key_pairs = generate_pre_keys(10, 3)
+        self.key_store.save_pre_key_pairs(pre_key_pairs)
+
+        self.assertEqual(self.key_store.load_pre_key_ids(), [10, 11, 12])
+
+        iterator = self.key_store.iter_pre_key_pairs()
+        first = next(iterator)
+        self.assertEqual(first.key_id, 10)
+        self.assertEqual(first.private_key_bytes, pre_key_pairs[0].private_key_bytes)
+        self.assertEqual(len(list(iterator)), 2)
+
+    def test_repeat_loads_return_independent_current_keys(self):
+        """Test that each load returns its own object and never a stale key"""
+        self.key_store.save_pre_key_pair(generate_pre_key_pair(1))
+        first = self.key_store.load_pre_key_pair(1)
+        self.assertIsNot(self.key_store.load_pre_key_pair(1), first)
+
+        replacement = generate_pre_key_pair(1)
+        self.key_store.save_pre_key_pair(replacement)
+        self.assertEqual(
+            self.key_store.load_pre_key_pair(1).private_key_bytes,
+            replacement.private_key_bytes
+        )
+
     def test_remove_pre_key_pair(self):
         """Test removing a pre-key pair"""
         # Generate and save a pre-key pair
@@ -127,6 +156,190 @@ class TestPreKeyStorage(unittest.TestCase):
             loaded_signed_pre_key_pair.timestamp
         )
 
+    def test_iter_signed_pre_key_pairs(self):
+        """Test lazily iterating signed pre-key pairs"""
+        identity_key_pair = generate_identity_key_pair()
+        for key_id in (1, 2):
+            self.key_store.save_signed_pre_key_pair(
+                generate_signed_pre_key_pair(identity_key_pair, key_id))
+
+        iterator = self.key_store.iter_signed_pre_key_pairs()
+        self.assertEqual(next(iterator).key_id, 1)
+        self.assertEqual([p.key_id for p in iterator], [2])
+        self.assertEqual(len(self.key_store.load_signed_pre_key_pairs()), 2)
+
+    def test_changes_persist_across_instances(self):
+        """Test that saved keys are written to disk for new store instances"""
+        pre_key_pairs = generate_pre_keys(1, 3)
+        self.key_store.save_pre_key_pairs(pre_key_pairs)
+        self.key_store.remove_pre_key_pair(2)
+
+        reopened = KeyStore(self.storage_path)
+        self.assertEqual(
+            sorted(p.key_id for p in reopened.load_pre_key_pairs()),
+            [1, 3]
+        )
+
+    def test_save_leaves_no_temporary_file(self):
+        """Test that saving replaces the store without leaving a temp file"""
+        self.key_store.save_pre_key_pair(generate_pre_key_pair(1))
+        self.key_store.compact()
+        self.assertFalse(os.path.exists(self.storage_path + '.tmp'))
+        self.assertIsNotNone(KeyStore(self.storage_path).load_pre_key_pair(1))
+
+    @unittest.skipIf(os.name == 'nt', "POSIX file permissions")
+    def test_store_files_keep_owner_only_permissions(self):
+        """Test that compaction and the log don't widen the store's permissions"""
+        os.chmod(self.storage_path, 0o600)
+        old_umask = os.umask(0o022)
+        try:
+            self.key_store.save_pre_key_pair(generate_pre_key_pair(1))
+            self.assertEqual(stat.S_IMODE(os.stat(self.key_store.wal_path).st_mode), 0o600)
+
+            self.key_store.compact()
+            self.assertEqual(stat.S_IMODE(os.stat(self.storage_path).st_mode), 0o600)
+
+            # A brand new store is owner-only from the start
+            new_path = self.storage_path + '.new'
+            try:
+                KeyStore(new_path).save_identity_key_pair(generate_identity_key_pair())
+                self.assertEqual(stat.S_IMODE(os.stat(new_path + '.wal').st_mode), 0o600)
+            finally:
+                os.unlink(new_path + '.wal')
+        finally:
+            os.umask(old_umask)
+
+    def test_compact_folds_log_into_snapshot(self):
+        """Test that compaction removes the log without losing changes"""
+        self.key_store.save_pre_key_pairs(generate_pre_keys(1, 3))
+        self.assertTrue(os.path.exists(self.key_store.wal_path))
+
+        self.key_store.compact()
+        self.assertFalse(os.path.exists(self.key_store.wal_path))
+        self.assertEqual(KeyStore(self.storage_path).load_pre_key_ids(), [1, 2, 3])
+
+    def test_removed_private_key_is_not_left_on_disk(self):
+        """Test that removing or replacing a key leaves no copy of its private key"""
+        pre_key_pairs = generate_pre_keys(1, 3)
+        self.key_store.save_pre_key_pairs(pre_key_pairs)
+        signed_pre_key_pair = generate_signed_pre_key_pair(generate_identity_key_pair(), 1)
+        self.key_store.save_signed_pre_key_pair(signed_pre_key_pair)
+
+        self.key_store.remove_pre_key_pair(1)
+        self.key_store.remove_signed_pre_key_pair(1)
+        with self.key_store.batch():
+            self.key_store.remove_pre_key_pair(2)
+        self.key_store.save_pre_key_pair(generate_pre_key_pair(3))
+
+        on_disk = b''
+        for path in (self.storage_path, self.key_store.wal_path):
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    on_disk += f.read()
+        self.assertIn(base64.b64encode(self.key_store.load_pre_key_pair(3).private_key_bytes), on_disk)
+        for removed in pre_key_pairs + [signed_pre_key_pair]:
+            self.assertNotIn(base64.b64encode(removed.private_key_bytes), on_disk)
+
+    def test_batch_defers_writes_until_exit(self):
+        """Test that changes inside batch() are written once, on exit"""
+        with self.key_store.batch():
+            for key_id in range(1, 4):
+                self.key_store.save_pre_key_pair(generate_pre_key_pair(key_id))
+            self.key_store.remove_pre_key_pair(2)
+
+            self.assertEqual(self.key_store.load_pre_key_ids(), [1, 3])
+            self.assertFalse(os.path.exists(self.key_store.wal_path))
+
+        self.assertEqual(KeyStore(self.storage_path).load_pre_key_ids(), [1, 3])
+
+    def test_reload_picks_up_other_writers(self):
+        """Test that reload() re-reads the store only after it changed on disk"""
+        self.assertFalse(self.key_store.reload())
+
+        other = KeyStore(self.storage_path)
+        other.save_pre_key_pair(generate_pre_key_pair(7))
+        self.assertIsNone(self.key_store.load_pre_key_pair(7))
+
+        self.assertTrue(self.key_store.reload())
+        self.assertIsNotNone(self.key_store.load_pre_key_pair(7))
+        self.assertFalse(self.key_store.reload())
+
+    def test_interleaved_writers_keep_each_others_keys(self):
+        """Test that writes through separate instances merge instead of overwriting"""
+        first = self.key_store
+        second = KeyStore(self.storage_path)
+        identity_key_pair = generate_identity_key_pair()
+
+        first.save_identity_key_pair(identity_key_pair)
+        second.save_pre_key_pair(generate_pre_key_pair(1))
+        first.save_pre_key_pair(generate_pre_key_pair(2))
+        self.assertEqual(first.load_pre_key_ids(), [1, 2])
+
+        second.compact()
+        reopened = KeyStore(self.storage_path)
+        self.assertEqual(reopened.load_pre_key_ids(), [1, 2])
+        self.assertEqual(
+            reopened.load_identity_key_pair().private_key_bytes,
+            identity_key_pair.private_key_bytes
+        )
+
+    def test_compaction_keeps_other_writers_changes(self):
+        """Test that compacting never drops keys another instance logged meanwhile"""
+        first = self.key_store
+        second = KeyStore(self.storage_path)
+
+        first.save_pre_key_pair(generate_pre_key_pair(1))
+        second.save_pre_key_pair(generate_pre_key_pair(2))
+        first.save_pre_key_pair(generate_pre_key_pair(3))
+
+        # Removing a key compacts the store
+        first.remove_pre_key_pair(1)
+        self.assertEqual(first.load_pre_key_ids(), [2, 3])
+        self.assertEqual(KeyStore(self.storage_path).load_pre_key_ids(), [2, 3])
+
+        # The other instance's next write keeps the compacted result too
+        second.save_pre_key_pair(generate_pre_key_pair(4))
+        self.assertEqual(sorted(KeyStore(self.storage_path).load_pre_key_ids()), [2, 3, 4])
+
+    def test_torn_log_record_is_ignored(self):
+        """Test that a partially written last log record is skipped on load"""
+        self.key_store.save_pre_key_pair(generate_pre_key_pair(1))
+        with open(self.key_store.wal_path, 'ab') as f:
+            f.write(b'{"op":"put","section":"pre_k')
+
+        reopened = KeyStore(self.storage_path)
+        self.assertEqual(reopened.load_pre_key_ids(), [1])
+
+        # Later changes must not be lost behind the torn record
+        reopened.save_pre_key_pair(generate_pre_key_pair(2))
+        self.assertEqual(KeyStore(self.storage_path).load_pre_key_ids(), [1, 2])
+
+    def test_log_record_without_newline_is_torn(self):
+        """Test that a last record missing its newline is dropped, not joined to the next"""
+        self.key_store.save_pre_key_pairs([generate_pre_key_pair(1)])
+        self.key_store.save_pre_key_pairs([generate_pre_key_pair(2)])
+        with open(self.key_store.wal_path, 'r+b') as f:
+            f.truncate(os.path.getsize(self.key_store.wal_path) - 1)
+
+        reopened = KeyStore(self.storage_path)
+        self.assertEqual(reopened.load_pre_key_ids(), [1])
+
+        reopened.save_pre_key_pair(generate_pre_key_pair(3))
+        self.assertEqual(KeyStore(self.storage_path).load_pre_key_ids(), [1, 3])
+
+    def test_readers_never_truncate_the_log(self):
+        """Test that loading or reloading a store leaves a torn log for the writer"""
+        self.key_store.save_pre_key_pair(generate_pre_key_pair(1))
+        with open(self.key_store.wal_path, 'ab') as f:
+            f.write(b'{"op":"put","section":"pre_k')
+        size = os.path.getsize(self.key_store.wal_path)
+
+        reader = KeyStore(self.storage_path)
+        self.assertTrue(self.key_store.reload())
+        self.assertFalse(reader.reload())
+        self.assertEqual(os.path.getsize(self.key_store.wal_path), size)
+        self.assertEqual(reader.load_pre_key_ids(), [1])
+
 
 if __name__ == '__main__':
     unittest.main()
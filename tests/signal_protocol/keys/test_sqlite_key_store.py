@@ -0,0 +1,124 @@
+import os
+import tempfile
+import unittest
+from signal_protocol.keys.pre_keys.base_pre_key import (
+    generate_pre_key_pair,
+    generate_pre_keys
+)
+from signal_protocol.keys.pre_keys.signed_pre_key import generate_signed_pre_key_pair
+from signal_protocol.keys.identity_key import generate_identity_key_pair
+from signal_protocol.keys.sqlite_key_store import (
+    SQLiteKeyStore,
+    create_sqlite_key_store
+)
+
+
+class TestSQLiteKeyStore(unittest.TestCase):
+    def setUp(self):
+        """Set up a temporary database for testing"""
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.storage_path = os.path.join(self.temp_dir.name, 'keys.db')
+        self.key_store = create_sqlite_key_store(self.storage_path)
+
+    def tearDown(self):
+        """Close the database and clean up the temporary directory"""
+        self.key_store.close()
+        self.temp_dir.cleanup()
+
+    def test_save_and_load_identity_key_pair(self):
+        """Test saving and loading an identity key pair"""
+        self.assertIsNone(self.key_store.load_identity_key_pair())
+
+        key_pair = generate_identity_key_pair()
+        self.key_store.save_identity_key_pair(key_pair)
+
+        loaded_key_pair = self.key_store.load_identity_key_pair()
+        self.assertEqual(key_pair.public_key_bytes, loaded_key_pair.public_key_bytes)
+        self.assertEqual(key_pair.private_key_bytes, loaded_key_pair.private_key_bytes)
+        self.assertEqual(
+            key_pair.ed25519_verify_key_bytes,
+            loaded_key_pair.ed25519_verify_key_bytes
+        )
+
+    def test_save_load_and_remove_pre_key_pairs(self):
+        """Test saving, loading and removing pre-key pairs"""
+        pre_key_pairs = generate_pre_keys(10, 5)
+        self.key_store.save_pre_key_pairs(pre_key_pairs)
+        self.key_store.save_pre_key_pair(generate_pre_key_pair(1))
+
+        self.assertEqual(self.key_store.load_pre_key_ids(), [1, 10, 11, 12, 13, 14])
+
+        loaded = self.key_store.load_pre_key_pair(12)
+        self.assertEqual(loaded.key_id, 12)
+        self.assertEqual(loaded.public_key_bytes, pre_key_pairs[2].public_key_bytes)
+        self.assertEqual(loaded.private_key_bytes, pre_key_pairs[2].private_key_bytes)
+
+        self.assertTrue(self.key_store.remove_pre_key_pair(12))
+        self.assertFalse(self.key_store.remove_pre_key_pair(12))
+        self.assertIsNone(self.key_store.load_pre_key_pair(12))
+        self.assertEqual(len(self.key_store.load_pre_key_pairs()), 5)
+
+    def test_save_and_load_signed_pre_key_pair(self):
+        """Test saving, loading and removing a signed pre-key pair"""
+        identity_key_pair = generate_identity_key_pair()
+        signed_pre_key_pair = generate_signed_pre_key_pair(identity_key_pair, 1)
+        self.key_store.save_signed_pre_key_pair(signed_pre_key_pair)
+
+        loaded = self.key_store.load_signed_pre_key_pair(1)
+        self.assertEqual(signed_pre_key_pair.private_key_bytes, loaded.private_key_bytes)
+        self.assertEqual(signed_pre_key_pair.timestamp, loaded.timestamp)
+        self.assertEqual(len(self.key_store.load_signed_pre_key_pairs()), 1)
+
+        self.assertTrue(self.key_store.remove_signed_pre_key_pair(1))
+        self.assertIsNone(self.key_store.load_signed_pre_key_pair(1))
+
+    def test_removed_private_key_is_not_left_on_disk(self):
+        """Test that a removed or replaced private key is wiped from the database and its log"""
+        pre_key_pairs = generate_pre_keys(1, 20)
+        self.key_store.save_pre_key_pairs(pre_key_pairs)
+        identity_key_pair = generate_identity_key_pair()
+        self.key_store.save_identity_key_pair(identity_key_pair)
+        signed_pre_key_pair = generate_signed_pre_key_pair(identity_key_pair, 1)
+        self.key_store.save_signed_pre_key_pair(signed_pre_key_pair)
+        signed_pre_key_pair_2 = generate_signed_pre_key_pair(identity_key_pair, 2)
+        self.key_store.save_signed_pre_key_pair(signed_pre_key_pair_2)
+
+        # Removed keys
+        self.key_store.remove_pre_key_pair(5)
+        self.key_store.remove_signed_pre_key_pair(1)
+
+        # Keys replaced by a new one under the same ID
+        self.key_store.save_identity_key_pair(generate_identity_key_pair())
+        self.key_store.save_pre_key_pair(generate_pre_key_pair(6))
+        self.key_store.save_pre_key_pairs(generate_pre_keys(7, 2))
+        self.key_store.save_signed_pre_key_pair(
+            generate_signed_pre_key_pair(identity_key_pair, 2))
+
+        dropped = [
+            pre_key_pairs[4], pre_key_pairs[5], pre_key_pairs[6], pre_key_pairs[7],
+            identity_key_pair, signed_pre_key_pair, signed_pre_key_pair_2
+        ]
+
+        # Checked while the connection is still open; close() would
+        # checkpoint the log on its own
+        for path in (self.storage_path, self.storage_path + '-wal'):
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    on_disk = f.read()
+                for key_pair in dropped:
+                    self.assertNotIn(key_pair.private_key_bytes, on_disk)
+
+    def test_changes_persist_across_instances(self):
+        """Test that changes are visible to a new connection"""
+        self.key_store.save_pre_key_pairs(generate_pre_keys(1, 3))
+        self.key_store.remove_pre_key_pair(2)
+
+        reopened = SQLiteKeyStore(self.storage_path)
+        try:
+            self.assertEqual(reopened.load_pre_key_ids(), [1, 3])
+        finally:
+            reopened.close()
+
+
+if __name__ == '__main__':
+    unittest.main()